@@ -0,0 +1,156 @@
+"""
+asyncio server for the /chat/ask flow.
+
+Runs next to the Flask app (python run_async.py) and answers the same
+request with the same JSON, but every wait on Ollama, Mongo or the vector
+store is awaited, so one process holds hundreds of in-flight questions.
+Route /chat/ask to it from the reverse proxy; everything else stays on Flask.
+"""
+import jwt
+from aiohttp import web
+from limits import parse
+from limits.aio.storage import MemoryStorage
+from limits.aio.strategies import FixedWindowRateLimiter
+from pymongo import AsyncMongoClient
+
+import app.extensions as extensions
+from app.config import Config
+from app.middlewares.auth_middleware import decode_auth_header
+from app.services.async_chat_service import AsyncChatService
+from app.services.async_ollama_client import async_ollama_client
+from app.utils.ask_request import validate_ask_payload, owned_document_query, DOCUMENT_NOT_FOUND
+
+
+CHAT_SERVICE = web.AppKey("chat_service", AsyncChatService)
+MONGO = web.AppKey("mongo", AsyncMongoClient)
+RATE_LIMITER = web.AppKey("rate_limiter", FixedWindowRateLimiter)
+
+# Same budget as the Flask /chat/ask route, counted per user
+ASK_LIMIT = parse("20 per minute")
+
+
+@web.middleware
+async def cors_middleware(request, handler):
+    if request.method == "OPTIONS":
+        response = web.Response()
+    else:
+        response = await handler(request)
+
+    origin = request.headers.get("Origin")
+    if origin in Config.CORS_ORIGINS:
+        response.headers["Access-Control-Allow-Origin"] = origin
+        response.headers["Access-Control-Allow-Credentials"] = "true"
+        response.headers["Access-Control-Allow-Headers"] = "Authorization, Content-Type"
+        response.headers["Access-Control-Allow-Methods"] = "POST, OPTIONS"
+
+    return response
+
+
+def _authenticate(request):
+    """
+    Returns (user, None) or (None, error_response), mirroring jwt_required
+    """
+    auth_header = request.headers.get("Authorization")
+
+    if not auth_header:
+        return None, web.json_response({"error": "Authorization header missing"}, status=401)
+
+    try:
+        return decode_auth_header(auth_header), None
+    except jwt.ExpiredSignatureError:
+        return None, web.json_response({"error": "Token expired"}, status=401)
+    except Exception as e:
+        return None, web.json_response({"error": "Invalid token", "details": str(e)}, status=401)
+
+
+async def ask_question(request):
+    user, error = _authenticate(request)
+    if error:
+        return error
+
+    if not await request.app[RATE_LIMITER].hit(ASK_LIMIT, "chat-ask", user["userId"]):
+        return web.json_response({
+            "success": False,
+            "message": f"Rate limit exceeded: {ASK_LIMIT}"
+        }, status=429)
+
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+
+    message, question, document_id = validate_ask_payload(data)
+
+    if message:
+        return web.json_response({
+            "success": False,
+            "message": message
+        }, status=400)
+
+    chat_service = request.app[CHAT_SERVICE]
+    user_id = user["userId"]
+
+    document = await chat_service.db.documents.find_one(
+        owned_document_query(document_id, user_id)
+    )
+
+    if not document:
+        return web.json_response({
+            "success": False,
+            "message": DOCUMENT_NOT_FOUND
+        }, status=404)
+
+    try:
+        result = await chat_service.aask_question(
+            question=question,
+            user_id=user_id,
+            document_id=document_id,
+            version=document.get("version", 0)
+        )
+        return web.json_response({
+            "success": True,
+            "data": result
+        })
+
+    except Exception as e:
+        print("Async chat error:", str(e))
+        return web.json_response({
+            "success": False,
+            "message": str(e)
+        }, status=500)
+
+
+async def health(request):
+    return web.json_response({"status": "Async backend running"})
+
+
+async def _on_startup(app):
+    # The synchronous client backs the write-behind buffer and the
+    # embedding cache, which are shared with the Flask process code
+    extensions.connect_mongo(Config.MONGO_URI)
+
+    mongo = AsyncMongoClient(Config.MONGO_URI, serverSelectionTimeoutMS=5000)
+    app[MONGO] = mongo
+    app[CHAT_SERVICE] = AsyncChatService(mongo.get_default_database())
+    app[RATE_LIMITER] = FixedWindowRateLimiter(MemoryStorage())
+
+    await async_ollama_client.start()
+    print("Async chat server ready")
+
+
+async def _on_cleanup(app):
+    await async_ollama_client.close()
+    await app[MONGO].close()
+
+
+def create_async_app() -> web.Application:
+    app = web.Application(middlewares=[cors_middleware])
+
+    app.router.add_get("/", health)
+    app.router.add_post("/chat/ask", ask_question)
+    app.router.add_route("OPTIONS", "/chat/ask", ask_question)
+
+    app.on_startup.append(_on_startup)
+    app.on_cleanup.append(_on_cleanup)
+
+    return app
@@ -14,17 +14,89 @@ class Config:
 
     JWT_EXP_HOURS = int(os.getenv("JWT_EXP_HOURS", 24))
 
+    # Changing the method rehashes each password on its next successful login
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 32))
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", 5))
+
 
     MONGO_URI = os.getenv(
         "MONGO_URI",
         "mongodb://localhost:27017/ai_knowledge"
     )
 
-    VECTOR_DB_PATH = os.getenv("VECTOR_DB_PATH", "vector_store/chroma")
+    # "pinecone" (managed, needs PINECONE_* env) or "local" (in-process, on disk)
+    VECTOR_STORE = os.getenv("VECTOR_STORE", "pinecone")
+    VECTOR_DB_PATH = os.getenv("VECTOR_DB_PATH", "vector_store/local")
+
+    # "structured" packs whole sentences up to CHUNK_MAX_TOKENS,
+    # "fixed" is the legacy CHUNK_SIZE character window
+    CHUNKER = os.getenv("CHUNKER", "structured")
+    CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", 200))
+    CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", 30))
 
     CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 500))
     CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 100))
 
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1500))
+
+    CHUNK_CACHE_SIZE = int(os.getenv("CHUNK_CACHE_SIZE", 5000))
+
+    MULTI_ASK_MAX_DOCUMENTS = int(os.getenv("MULTI_ASK_MAX_DOCUMENTS", 100))
+    MULTI_ASK_TOP_K = int(os.getenv("MULTI_ASK_TOP_K", 8))
+    VECTOR_FANOUT_WORKERS = int(os.getenv("VECTOR_FANOUT_WORKERS", 8))
+
+    BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", 50))
+    BATCH_SEARCH_WORKERS = int(os.getenv("BATCH_SEARCH_WORKERS", 8))
+    BATCH_GENERATION_WORKERS = int(os.getenv("BATCH_GENERATION_WORKERS", 4))
+
+    UPLOAD_READ_BLOCK = int(os.getenv("UPLOAD_READ_BLOCK", 256 * 1024))
+    # Single-request /documents/upload, larger files use the resumable protocol
+    UPLOAD_SIMPLE_MAX_BYTES = int(os.getenv("UPLOAD_SIMPLE_MAX_BYTES", 5 * 1024 * 1024))
+    UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 500 * 1024 * 1024))
+    UPLOAD_PART_SIZE = int(os.getenv("UPLOAD_PART_SIZE", 8 * 1024 * 1024))
+    UPLOAD_SESSION_TTL_HOURS = int(os.getenv("UPLOAD_SESSION_TTL_HOURS", 24))
+    # TXT uploads start ingesting the parts received so far
+    UPLOAD_EARLY_INGEST = os.getenv("UPLOAD_EARLY_INGEST", "true").lower() == "true"
+    # A job waiting for more parts runs again after this, or as soon as a
+    # part extends the contiguous prefix
+    UPLOAD_INGEST_POLL_SECONDS = int(os.getenv("UPLOAD_INGEST_POLL_SECONDS", 30))
+    TXT_READ_BLOCK = int(os.getenv("TXT_READ_BLOCK", 64 * 1024))
+    PIPELINE_QUEUE_BATCHES = int(os.getenv("PIPELINE_QUEUE_BATCHES", 4))
+
+    PDF_WORKERS = int(os.getenv("PDF_WORKERS", min(4, os.cpu_count() or 1)))
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 20))
+
+    EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 32))
+    VECTOR_UPSERT_BATCH_SIZE = int(os.getenv("VECTOR_UPSERT_BATCH_SIZE", 100))
+
+    ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.95))
+    ANSWER_CACHE_DOCUMENTS = int(os.getenv("ANSWER_CACHE_DOCUMENTS", 1000))
+    ANSWER_CACHE_PER_DOCUMENT = int(os.getenv("ANSWER_CACHE_PER_DOCUMENT", 50))
+    ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", 3600))
+
+    WRITE_BUFFER_FLUSH_SECONDS = float(os.getenv("WRITE_BUFFER_FLUSH_SECONDS", 2))
+    WRITE_BUFFER_MAX_ITEMS = int(os.getenv("WRITE_BUFFER_MAX_ITEMS", 500))
+    # Writes kept for retry while MongoDB rejects them, the oldest are dropped past this
+    WRITE_BUFFER_MAX_PENDING = int(os.getenv("WRITE_BUFFER_MAX_PENDING", 50000))
+
+    # Off on web nodes that should only enqueue, another process runs the jobs
+    INGEST_WORKERS_ENABLED = os.getenv("INGEST_WORKERS_ENABLED", "true").lower() == "true"
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 2))
+    INGEST_MAX_PENDING = int(os.getenv("INGEST_MAX_PENDING", 100))
+    INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", 3))
+    INGEST_RETRY_BACKOFF_SECONDS = int(os.getenv("INGEST_RETRY_BACKOFF_SECONDS", 10))
+    INGEST_JOB_LEASE_SECONDS = int(os.getenv("INGEST_JOB_LEASE_SECONDS", 120))
+    INGEST_POLL_SECONDS = int(os.getenv("INGEST_POLL_SECONDS", 5))
+
+    # Daily usage rollups are kept forever, hourly ones expire
+    USAGE_HOURLY_RETENTION_DAYS = int(os.getenv("USAGE_HOURLY_RETENTION_DAYS", 90))
+
+    PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", 50))
+    PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", 200))
+
     CORS_ORIGINS = os.getenv(
         "CORS_ORIGINS",
         "http://localhost:5173"
@@ -44,3 +116,16 @@ class Config:
         "OLLAMA_EMBED_MODEL",
         "nomic-embed-text"
     )
+
+    OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", 4))
+    OLLAMA_QUEUE_TIMEOUT = float(os.getenv("OLLAMA_QUEUE_TIMEOUT", 30))
+    # The asyncio server (run_async.py) queues waiting questions as coroutines,
+    # so they can wait for an Ollama slot much longer than a worker thread
+    ASYNC_OLLAMA_QUEUE_TIMEOUT = float(os.getenv("ASYNC_OLLAMA_QUEUE_TIMEOUT", 300))
+    OLLAMA_MAX_RETRIES = int(os.getenv("OLLAMA_MAX_RETRIES", 2))
+    OLLAMA_RETRY_BACKOFF_SECONDS = float(os.getenv("OLLAMA_RETRY_BACKOFF_SECONDS", 0.5))
+    OLLAMA_BREAKER_THRESHOLD = int(os.getenv("OLLAMA_BREAKER_THRESHOLD", 5))
+    OLLAMA_BREAKER_RESET_SECONDS = float(os.getenv("OLLAMA_BREAKER_RESET_SECONDS", 30))
+
+    EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", 10000))
+    EMBED_CACHE_PERSISTENT = os.getenv("EMBED_CACHE_PERSISTENT", "true").lower() == "true"
@@ -1,6 +1,7 @@
 from pymongo import MongoClient
 from pymongo.errors import PyMongoError , ServerSelectionTimeoutError
 import os
+from app.schema import ensure_indexes
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
@@ -14,10 +15,13 @@ limiter = Limiter(
 )
 
 def init_mongo(app):
+    connect_mongo(app.config["MONGO_URI"])
+
+
+def connect_mongo(mongo_uri: str):
     global mongo_client, db , mongo_connected
 
     try:
-        mongo_uri = app.config["MONGO_URI"]
         mongo_client = MongoClient(mongo_uri , serverSelectionTimeoutMS=5000)
 
         mongo_client.admin.command("ping")
@@ -26,6 +30,8 @@ def init_mongo(app):
         mongo_connected = True
         print("MongoDB connected sucessfully")
 
+        ensure_indexes(db)
+
 
     except (PyMongoError, ServerSelectionTimeoutError) as e:
             db = None
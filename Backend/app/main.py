@@ -2,6 +2,8 @@ from flask import Flask
 from flask_cors import CORS
 from app.config import Config
 from app.extensions import init_mongo , limiter
+from app.schema import register_commands
+from app.utils.worker_pool import in_pool_worker
 
 def create_app():
     app = Flask(__name__)
@@ -13,8 +15,14 @@ def create_app():
         supports_credentials=True
     )
 
-    init_mongo(app)
+    # PDF and password hashing pool workers re-import the entry module, they
+    # only run pure functions and must not connect or claim ingestion jobs
+    background = not in_pool_worker()
+
+    if background:
+        init_mongo(app)
     limiter.init_app(app)
+    register_commands(app)
 
     # Register routes
     from app.routes.auth import auth_bp
@@ -27,6 +35,12 @@ def create_app():
     app.register_blueprint(chat_bp, url_prefix="/chat")
     app.register_blueprint(admin_bp, url_prefix="/admin")
 
+    # Started by the first request rather than here, so CLI commands such
+    # as verify-indexes never recover or claim jobs
+    if background and Config.INGEST_WORKERS_ENABLED:
+        from app.services.ingestion_queue import ingestion_queue
+        app.before_request(ingestion_queue.start)
+
     @app.route("/")
     def health():
         return {"status": "Backend running"}, 200
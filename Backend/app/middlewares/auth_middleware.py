@@ -3,6 +3,25 @@ from flask import request, jsonify
 import jwt
 from app.config import Config
 
+def decode_auth_header(auth_header: str) -> dict:
+    """
+    Decode a "Bearer <token>" header into the request user, raises
+    jwt.ExpiredSignatureError or another exception when it is not valid
+    """
+    token = auth_header.split(" ")[1]  # Bearer <token>
+    payload = jwt.decode(
+        token,
+        Config.JWT_SECRET,
+        algorithms=["HS256"]
+    )
+
+    return {
+        "userId": payload["userId"],
+        "email": payload["email"],
+        "role": payload.get("role", "user")
+    }
+
+
 def jwt_required(role=None):
     def decorator(fn):
         @wraps(fn)
@@ -13,18 +32,7 @@ def jwt_required(role=None):
                 return jsonify({"error": "Authorization header missing"}), 401
 
             try:
-                token = auth_header.split(" ")[1]  # Bearer <token>
-                payload = jwt.decode(
-                token,
-                Config.JWT_SECRET,
-                algorithms=["HS256"]
-                )
-
-                request.user = {
-                "userId": payload["userId"],
-                "email": payload["email"],
-                "role": payload.get("role", "user")
-                }
+                request.user = decode_auth_header(auth_header)
 
                 if role and request.user["role"] != role:
                     return jsonify(
@@ -2,15 +2,30 @@ from typing import Any
 from flask import Blueprint, jsonify, request
 from bson import ObjectId
 from bson.errors import InvalidId
-from datetime import datetime
+from datetime import datetime, timezone
 
 from app.middlewares.auth_middleware import jwt_required
 import app.extensions as extensions
 from app.utils.serializer import serialize_dict
+from app.services.embedding_cache import embedding_cache
+from app.services.answer_cache import answer_cache
+from app.services.stats_service import stats_service, USER_COUNTERS
+from app.services.usage_rollup_service import usage_rollup_service, GRANULARITIES, GROUP_FIELDS
+from app.utils.pagination import keyset_filter, keyset_sort, parse_limit, split_page
 
 admin_bp = Blueprint("admin", __name__)
 
 
+def _parse_date(value):
+    if not value:
+        return None
+
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
 
 
 
@@ -23,49 +38,45 @@ def get_all_users():
     
 
     try:
-       
+        limit = parse_limit(request.args.get("limit"))
+        query = keyset_filter(request.args.get("cursor"))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    try:
+        # Counts are maintained on write (stats_service), so a page is one
+        # index range scan on (createdAt, _id) with no joins
         users = list(
-            extensions.db.users.aggregate([
-                {
-                    "$lookup": {
-                        "from": "documents",
-                        "localField": "_id",
-                        "foreignField": "userId",
-                        "as": "documents"
-                    }
-                },
-                {
-                    "$lookup": {
-                        "from": "chat_messages",
-                        "localField": "_id",
-                        "foreignField": "userId",
-                        "as": "queries"
-                    }
-                },
+            extensions.db.users.find(
+                query,
                 {
-                    "$project": {
-                        "_id": 1,
-                        "email": 1,
-                        "role": {"$ifNull": ["$role", "user"]},
-                        "createdAt": 1,
-                        "lastLogin": 1,
-                        "documentCount": {"$size": "$documents"},
-                        "queryCount": {"$size": "$queries"}
-                    }
-                },
-                {"$sort": {"createdAt": -1}}
-            ])
+                    "email": 1,
+                    "role": 1,
+                    "createdAt": 1,
+                    "lastLogin": 1,
+                    "documentCount": 1,
+                    "queryCount": 1,
+                    "tokenCount": 1
+                }
+            ).sort(keyset_sort()).limit(limit + 1)
         )
+        users, next_cursor = split_page(users, limit)
 
-      
-        users = [serialize_dict(user) for user in users]
-        
+        users = [
+            serialize_dict({
+                **user,
+                "role": user.get("role") or "user",
+                **{name: user.get(name, 0) for name in USER_COUNTERS}
+            })
+            for user in users
+        ]
 
         return jsonify({
             "success": True,
              "data": {
         "users": users,
-        "count": len(users)
+        "count": len(users),
+        "nextCursor": next_cursor
     }
         }), 200
 
@@ -170,20 +181,28 @@ def get_all_documents():
     
 
     try:
-        page = int(request.args.get("page", 1))
-        limit = int(request.args.get("limit", 20))
-        skip = (page - 1) * limit
+        limit = parse_limit(request.args.get("limit"))
+        query = keyset_filter(request.args.get("cursor"))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    try:
+        # Page first, then join: the $lookup only runs for the rows returned
         documents = list(
             extensions.db.documents.aggregate([
+                {"$match": query},
+                {"$sort": {"createdAt": -1, "_id": -1}},
+                {"$limit": limit + 1},
                 {
                     "$lookup": {
                         "from": "users",
                         "localField": "userId",
                         "foreignField": "_id",
+                        "pipeline": [{"$project": {"email": 1}}],
                         "as": "user"
                     }
                 },
-                {"$unwind": "$user"},
+                {"$unwind": {"path": "$user", "preserveNullAndEmptyArrays": True}},
                 {
                     "$project": {
                         "_id": 1,
@@ -195,15 +214,13 @@ def get_all_documents():
                         "userEmail": "$user.email",
                         "userId": 1
                     }
-                },
-                {"$sort": {"createdAt": -1}},
-                {"$skip": skip},
-                {"$limit": limit}
+                }
             ])
         )
+        documents, next_cursor = split_page(documents, limit)
 
         documents = [serialize_dict(doc) for doc in documents]
-        total_docs = extensions.db.documents.count_documents({})
+        total_docs = extensions.db.documents.estimated_document_count()
        
 
         return jsonify({
@@ -211,9 +228,9 @@ def get_all_documents():
             "data": {
         "documents": documents,
         "pagination": {
-            "page": page,
             "limit": limit,
-            "total": total_docs
+            "total": total_docs,
+            "nextCursor": next_cursor
         }
     }
         }), 200
@@ -242,19 +259,30 @@ def toggle_document(doc_id):
     "message": "Invalid document ID"
 }), 400
 
-    doc = extensions.db.documents.find_one({"_id": document_object_id})
-    if not doc:
-        return jsonify({
+    # Flip only if nobody else did since the read, so the activeDocuments
+    # delta is applied once per actual change
+    while True:
+        doc = extensions.db.documents.find_one({"_id": document_object_id}, {"enabled": 1})
+        if not doc:
+            return jsonify({
     "success": False,
     "message": "Document not found"
 }), 404
 
-    new_status = not doc.get("enabled", True)
+        new_status = not doc.get("enabled", True)
+        # A missing flag reads as enabled
+        current = False if new_status else {"$ne": False}
+
+        updated = extensions.db.documents.find_one_and_update(
+            {"_id": document_object_id, "enabled": current},
+            {"$set": {"enabled": new_status}, "$inc": {"version": 1}},
+            projection={"_id": 1}
+        )
+        if updated:
+            break
 
-    extensions.db.documents.update_one(
-        {"_id": document_object_id},
-        {"$set": {"enabled": new_status}}
-    )
+    answer_cache.invalidate_document(doc_id)
+    stats_service.increment(activeDocuments=1 if new_status else -1)
 
     return jsonify({
         "success": True,
@@ -266,22 +294,28 @@ def toggle_document(doc_id):
 @admin_bp.route("/queries", methods=["GET"])
 @jwt_required(role="admin")
 def view_queries():
-    page = int(request.args.get("page", 1))
-    limit = int(request.args.get("limit", 20))
-    skip = (page - 1) * limit
+    try:
+        limit = parse_limit(request.args.get("limit"))
+        query = keyset_filter(request.args.get("cursor"))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
 
     try:
         queries = list(
             extensions.db.chat_messages.aggregate([
+                {"$match": query},
+                {"$sort": {"createdAt": -1, "_id": -1}},
+                {"$limit": limit + 1},
                 {
                     "$lookup": {
                         "from": "users",
                         "localField": "userId",
                         "foreignField": "_id",
+                        "pipeline": [{"$project": {"email": 1}}],
                         "as": "user"
                     }
                 },
-                {"$unwind": "$user"},
+                {"$unwind": {"path": "$user", "preserveNullAndEmptyArrays": True}},
                 {
                     "$project": {
                         "_id": 1,
@@ -291,15 +325,13 @@ def view_queries():
                         "userEmail": "$user.email",
                         "userId": 1
                     }
-                },
-                {"$sort": {"createdAt": -1}},
-                {"$skip": skip},
-                {"$limit": limit}
+                }
                 ])
         )
+        queries, next_cursor = split_page(queries, limit)
 
         queries = [serialize_dict(q) for q in queries]
-        total_queries = extensions.db.chat_messages.count_documents({})
+        total_queries = extensions.db.chat_messages.estimated_document_count()
         
 
         return jsonify({
@@ -307,9 +339,9 @@ def view_queries():
              "data": {
         "queries": queries,
         "pagination": {
-            "page": page,
             "limit": limit,
-            "total": total_queries
+            "total": total_queries,
+            "nextCursor": next_cursor
         }
     }
         }), 200
@@ -329,28 +361,40 @@ def view_queries():
 def usage_stats():
     
 
+    granularity = request.args.get("granularity", "day")
+    group_by = [
+        name.strip()
+        for name in request.args.get("groupBy", "user").split(",")
+        if name.strip()
+    ]
+
+    if granularity not in GRANULARITIES:
+        return jsonify({
+    "success": False,
+    "message": f"granularity must be one of {', '.join(GRANULARITIES)}"
+}), 400
+
+    if not group_by or any(name not in GROUP_FIELDS for name in group_by):
+        return jsonify({
+    "success": False,
+    "message": f"groupBy must be a comma separated list of {', '.join(GROUP_FIELDS)}"
+}), 400
+
     try:
-        usage = list(
-            extensions.db.usage_logs.aggregate([
-                {
-                    "$lookup": {
-                        "from": "users",
-                        "localField": "userId",
-                        "foreignField": "_id",
-                        "as": "user"
-                    }
-                },
-                {"$unwind": "$user"},
-                {
-                    "$group": {
-                        "_id": "$user.email",
-                        "userId": {"$first": "$user._id"},
-                        "tokens": {"$sum": "$tokens"}
-                    }
-                },
-                {"$sort": {"tokens": -1}}
-            ])
-        )
+        start = _parse_date(request.args.get("from"))
+        end = _parse_date(request.args.get("to"))
+    except ValueError:
+        return jsonify({
+    "success": False,
+    "message": "from and to must be ISO 8601 dates"
+}), 400
+
+    try:
+        usage = usage_rollup_service.query(granularity, group_by, start, end)
+
+        # Grouped by user only, rows keep the original {_id: email, userId, tokens} shape
+        if group_by == ["user"]:
+            usage = [{"_id": row.pop("email"), **row} for row in usage]
 
         formatted_usage = [serialize_dict(u) for u in usage]
         
@@ -359,7 +403,9 @@ def usage_stats():
             "success": True,
             "data": {
         "usage": formatted_usage,
-        "count": len(formatted_usage)
+        "count": len(formatted_usage),
+        "granularity": granularity,
+        "groupBy": group_by
     }
         }), 200
 
@@ -378,35 +424,18 @@ def dashboard_stats():
     
 
     try:
-        total_users = extensions.db.users.count_documents({})
-        
-        total_documents = extensions.db.documents.count_documents({})
-        
-        active_documents = extensions.db.documents.count_documents({"enabled": True})
-        
-        total_queries = extensions.db.chat_messages.count_documents({})
-        
-        from datetime import datetime, timedelta
-        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        queries_today = extensions.db.chat_messages.count_documents({
-            "createdAt": {"$gte": today_start}
-        })
-        
-        total_tokens_result = list(extensions.db.usage_logs.aggregate([
-            {"$group": {"_id": None, "total": {"$sum": "$tokens"}}}
-        ]))
-        total_tokens = total_tokens_result[0]["total"] if total_tokens_result else 0
+        stats = stats_service.get_dashboard()
 
         return jsonify({
             "success": True,
             "data": {
         "stats": {
-            "totalUsers": total_users,
-            "totalDocuments": total_documents,
-            "activeDocuments": active_documents,
-            "totalQueries": total_queries,
-            "queriesToday": queries_today,
-            "totalTokens": total_tokens
+            "totalUsers": stats["totalUsers"],
+            "totalDocuments": stats["totalDocuments"],
+            "activeDocuments": stats["activeDocuments"],
+            "totalQueries": stats["totalQueries"],
+            "queriesToday": stats["queriesToday"],
+            "totalTokens": stats["totalTokens"]
         }
     }
         }), 200
@@ -418,4 +447,38 @@ def dashboard_stats():
         return jsonify({
     "success": False,
     "message": "Failed to fetch dashboard stats"
-}), 500
\ No newline at end of file
+}), 500
+
+@admin_bp.route("/stats/reconcile", methods=["POST"])
+@jwt_required(role="admin")
+def reconcile_stats():
+    try:
+        stats = stats_service.reconcile()
+
+        return jsonify({
+            "success": True,
+            "data": {
+                "stats": stats
+            }
+        }), 200
+
+    except Exception as e:
+        print(f"Error in reconcile_stats: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+    "success": False,
+    "message": "Failed to reconcile stats"
+}), 500
+
+
+@admin_bp.route("/cache", methods=["GET"])
+@jwt_required(role="admin")
+def cache_stats():
+    return jsonify({
+        "success": True,
+        "data": {
+            "embeddingCache": embedding_cache.stats(),
+            "answerCache": answer_cache.stats()
+        }
+    }), 200
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from app.services.auth_service import AuthService
+from app.services.password_hasher import PasswordHasherBusy
 import re
 from app.extensions import limiter
 from app.middlewares.validation_middleware import validate_json
@@ -63,6 +64,11 @@ def register():
         "success": False,
         "message": str(e)
     }), 400
+    except PasswordHasherBusy as e:
+        return jsonify({
+        "success": False,
+        "message": str(e)
+    }), 503
 
 
 @auth_bp.route("/login", methods=["POST"])
@@ -95,3 +101,8 @@ def login():
         "success": False,
         "message": str(e)
     }), 401
+    except PasswordHasherBusy as e:
+        return jsonify({
+        "success": False,
+        "message": str(e)
+    }), 503
@@ -1,4 +1,5 @@
-from flask import Blueprint, request, jsonify
+import json
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from app.services.chat_service import ChatService
 from app.middlewares.auth_middleware import jwt_required
 import app.extensions as extensions
@@ -6,6 +7,16 @@ from bson import ObjectId
 from bson.errors import InvalidId
 from app.extensions import limiter
 from app.utils.serializer import serialize_dict
+from app.utils.ask_request import (
+    validate_ask_payload,
+    validate_batch_payload,
+    validate_documents_payload,
+    owned_documents_query,
+    owned_document_query,
+    DOCUMENT_NOT_FOUND
+)
+from app.config import Config
+from app.utils.pagination import keyset_filter, keyset_sort, parse_limit, split_page
 
 chat_bp = Blueprint("chat", __name__)
 chat_service = ChatService()
@@ -13,71 +24,158 @@ chat_service = ChatService()
 
 
 
+def _parse_ask_request():
+    """
+    Validates an ask payload, returns (error_response, question, document_id, version)
+    """
+    message, question, document_id = validate_ask_payload(request.get_json())
+
+    if message:
+        return (jsonify({
+    "success": False,
+    "message": message
+}), 400), None, None, None
+
+    user_id = request.user["userId"]
+
+    document = extensions.db.documents.find_one(
+        owned_document_query(document_id, user_id)
+    )
+
+    if not document:
+        return (jsonify({
+    "success": False,
+    "message": DOCUMENT_NOT_FOUND
+}), 404), None, None, None
+
+    return None, question, document_id, document.get("version", 0)
+
+
 @chat_bp.route("/ask", methods=["POST"])
 @jwt_required()
 @limiter.limit("20 per minute")
 def ask_question():
-    data = request.get_json()
+    error, question, document_id, version = _parse_ask_request()
+    if error:
+        return error
+
+    user_id = request.user["userId"]
 
-    if not data:
+    try:
+        result = chat_service.ask_question(
+            question=question,
+            user_id=user_id,
+            document_id=document_id,
+            version=version
+        )
         return jsonify({
-    "success": False,
-    "message": "Request body required"
-}), 400
+    "success": True,
+    "data": result
+}), 200
 
-    if "question" not in data or "documentId" not in data:
+    except Exception as e:
+        print("Chat error:", str(e))
         return jsonify({
     "success": False,
-    "message": "Both question and documentId are required"
-}), 400
+    "message": str(e)
+}), 500
+
+
+
+@chat_bp.route("/ask/batch", methods=["POST"])
+@jwt_required()
+@limiter.limit("5 per minute")
+def ask_questions():
+    """
+    Answer up to BATCH_MAX_QUESTIONS questions about one document in a single
+    request, results come back in question order
+    """
+    message, questions, document_id = validate_batch_payload(
+        request.get_json(), Config.BATCH_MAX_QUESTIONS
+    )
 
-    question = data["question"]
-    if not isinstance(question, str) or not question.strip():
+    if message:
         return jsonify({
     "success": False,
-    "message": "Question cannot be empty"
+    "message": message
 }), 400
 
-    if len(question) < 3:
+    user_id = request.user["userId"]
+
+    document = extensions.db.documents.find_one(
+        owned_document_query(document_id, user_id)
+    )
+
+    if not document:
         return jsonify({
     "success": False,
-    "message": "Question is too short"
-}), 400
-    
-    if len(question) > 500:
+    "message": DOCUMENT_NOT_FOUND
+}), 404
+
+    try:
+        results = chat_service.ask_questions(
+            questions=questions,
+            user_id=user_id,
+            document_id=document_id,
+            version=document.get("version", 0)
+        )
+        return jsonify({
+    "success": True,
+    "data": {
+        "results": results,
+        "count": len(results)
+    }
+}), 200
+
+    except Exception as e:
+        print("Batch chat error:", str(e))
         return jsonify({
     "success": False,
-    "message": "Question is too long (max 500 characters)"
-}), 400
-        
-    document_id = data["documentId"]
-    user_id = request.user["userId"]
+    "message": str(e)
+}), 500
 
-    try:
-        document_object_id = ObjectId(document_id)
-    except InvalidId:
+
+@chat_bp.route("/ask/documents", methods=["POST"])
+@jwt_required()
+@limiter.limit("20 per minute")
+def ask_documents():
+    """
+    Ask one question across documentIds, or across the user's enabled
+    documents (newest MULTI_ASK_MAX_DOCUMENTS) when documentIds is left out
+    """
+    message, question, document_ids = validate_documents_payload(
+        request.get_json(), Config.MULTI_ASK_MAX_DOCUMENTS
+    )
+
+    if message:
         return jsonify({
     "success": False,
-    "message": "Invalid documentId"
+    "message": message
 }), 400
 
-    document = extensions.db.documents.find_one({
-        "_id": document_object_id,
-        "userId": ObjectId(user_id),
-        "enabled": True
-    })
+    user_id = request.user["userId"]
 
-    if not document:
+    versions = {
+        str(document["_id"]): document.get("version", 0)
+        for document in extensions.db.documents.find(
+            owned_documents_query(document_ids, user_id),
+            {"_id": 1, "version": 1}
+        ).sort("createdAt", -1).limit(Config.MULTI_ASK_MAX_DOCUMENTS)
+    }
+    owned = list(versions)
+
+    if not owned or (document_ids is not None and len(owned) != len(document_ids)):
         return jsonify({
     "success": False,
-    "message": "Document not found or access denied"
+    "message": DOCUMENT_NOT_FOUND
 }), 404
 
     try:
-        result = chat_service.ask_question(
+        result = chat_service.ask_documents(
             question=question,
             user_id=user_id,
-            document_id=document_id
+            document_ids=owned,
+            versions=versions
         )
         return jsonify({
     "success": True,
@@ -85,13 +183,65 @@ def ask_question():
 }), 200
 
     except Exception as e:
-        print("Chat error:", str(e))
+        print("Multi-document chat error:", str(e))
         return jsonify({
     "success": False,
     "message": str(e)
 }), 500
 
 
+@chat_bp.route("/ask/stream", methods=["POST"])
+@jwt_required()
+@limiter.limit("20 per minute")
+def ask_question_stream():
+    """
+    Server-Sent Events variant of /ask, one "token" event per generated token
+    followed by a "done" event carrying the full answer
+    """
+    error, question, document_id, version = _parse_ask_request()
+    if error:
+        return error
+
+    user_id = request.user["userId"]
+
+    def events():
+        tokens = []
+        answer = chat_service.ask_question_stream(
+            question=question,
+            user_id=user_id,
+            document_id=document_id,
+            version=version
+        )
+        try:
+            for token in answer:
+                tokens.append(token)
+                yield _sse("token", {"token": token})
+
+            yield _sse("done", {"answer": "".join(tokens)})
+
+        except Exception as e:
+            print("Chat stream error:", str(e))
+            yield _sse("error", {"message": str(e)})
+
+        finally:
+            # On a client disconnect this closes the answer stream, which
+            # saves the partial answer and stops generation
+            answer.close()
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
 
 @chat_bp.route("/history", methods=["GET"])
 @jwt_required()
@@ -114,23 +264,35 @@ def chat_history():
     "message": "Invalid documentId"
 }), 400
 
+    try:
+        limit = parse_limit(request.args.get("limit"))
+        query = keyset_filter(request.args.get("cursor"))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    # Newest page first; nextCursor walks back to older messages
     messages = list(
         extensions.db.chat_messages
         .find(
             {
                 "userId": ObjectId(user_id),
-                "documentId": document_object_id
+                "documentId": document_object_id,
+                **query
             }
         )
-        .sort("createdAt", 1)  
+        .sort(keyset_sort())
+        .limit(limit + 1)
     )
+    messages, next_cursor = split_page(messages, limit)
+    messages.reverse()
 
     serialized_messages = [serialize_dict(msg) for msg in messages]
 
     return jsonify({
         "success": True,
          "data": {
-        "messages": serialized_messages
+        "messages": serialized_messages,
+        "nextCursor": next_cursor
     },
         "count": len(serialized_messages),
         "messages": serialized_messages
@@ -4,22 +4,27 @@ from flask import Blueprint, request, jsonify
 from werkzeug.utils import secure_filename
 from bson import ObjectId
 
-from app.services.document_service import DocumentService
+from app.services.ingestion_queue import ingestion_queue, IngestionQueueFull
+from app.services.upload_service import (
+    upload_service,
+    create_document,
+    enqueue_document,
+    UploadError,
+    UPLOAD_FOLDER
+)
 from app.middlewares.auth_middleware import jwt_required
 import app.extensions as extensions
 from app.extensions import limiter
 from app.utils.serializer import serialize_dict
-from threading import Thread
+from app.utils.file_store import save_stream, FileTooLarge
+from app.config import Config
 from datetime import datetime
 
 
 documents_bp = Blueprint("documents", __name__)
 
-UPLOAD_FOLDER = "uploads/documents"
 ALLOWED_EXTENSIONS = {"pdf", "txt"}
 
-document_service = DocumentService()
-
 
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -38,16 +43,6 @@ def upload_document():
 
     file = request.files["file"]
 
-    MAX_FILE_SIZE = 5 * 1024 * 1024
-
-    file.seek(0, os.SEEK_END)
-    file_size = file.tell()
-    file.seek(0)
-
-    if file_size > MAX_FILE_SIZE:
-        return jsonify({ "success": False, "message": "File size exceeds 5MB limit"}), 413
-    
-
     if file.filename == "":
         return jsonify({ "success" : False ,"message": "Empty filename"}), 400
 
@@ -61,40 +56,40 @@ def upload_document():
     if file.mimetype not in allowed_mimetypes:
         return jsonify({ "success": False,"message": "Invalid file type"}), 400
 
-    file.seek(0, os.SEEK_END)
-    if file.tell() == 0:
-        return jsonify({ "success": False, "message": "Uploaded file is empty"}), 400
-    file.seek(0)
-
     os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
     original_filename = secure_filename(file.filename)
     unique_filename = f"{uuid.uuid4()}_{original_filename}"
 
     file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
-    file.save(file_path)
+
+    # Size is enforced while the stream is written, not by seeking the upload
+    try:
+        content_hash, file_size = save_stream(
+            file.stream, file_path, max_bytes=Config.UPLOAD_SIMPLE_MAX_BYTES
+        )
+    except FileTooLarge:
+        os.remove(file_path)
+        return jsonify({
+            "success": False,
+            "message": f"File size exceeds {Config.UPLOAD_SIMPLE_MAX_BYTES // (1024 * 1024)}MB limit, use /documents/uploads"
+        }), 413
+
+    if file_size == 0:
+        os.remove(file_path)
+        return jsonify({ "success": False, "message": "Uploaded file is empty"}), 400
+
     user_id = request.user["userId"]
-    document = {
-    "userId": ObjectId(user_id),
-    "filename": unique_filename,
-    "originalFilename": original_filename,
-    "path": file_path,
-    "status": "processing",   # 👈 important
-    "enabled": True,
-    "createdAt": datetime.utcnow()
-}
-
-# save document in DB
-    doc_id = extensions.db.documents.insert_one(document).inserted_id
-    Thread(
-    target=document_service.ingest_document,
-    kwargs={
-        "document_id": str(doc_id),
-        "file_path": file_path,
-        "user_id": user_id
-    },
-    daemon=True
-    ).start()
+    doc_id = create_document(
+        user_id, unique_filename, original_filename, file_path,
+        contentHash=content_hash
+    )
+
+    try:
+        enqueue_document(doc_id, file_path, user_id)
+    except IngestionQueueFull as e:
+        os.remove(file_path)
+        return jsonify({"success": False, "message": str(e)}), 503
 
     print(f"File saved at {file_path}")
 
@@ -161,3 +156,155 @@ def list_documents():
     "documents": documents,   
     "count": len(documents)
 }), 200
+
+
+@documents_bp.route("/<document_id>/status", methods=["GET"])
+@jwt_required()
+@limiter.limit("60 per minute")
+def document_status(document_id):
+    user_id = request.user["userId"]
+
+    if not ObjectId.is_valid(document_id):
+        return jsonify({"success": False, "message": "Invalid documentId"}), 400
+
+    document = extensions.db.documents.find_one(
+        {"_id": ObjectId(document_id), "userId": ObjectId(user_id)},
+        {"status": 1, "error": 1, "totalChunks": 1}
+    )
+    if not document:
+        return jsonify({"success": False, "message": "Document not found"}), 404
+
+    job = ingestion_queue.get_job(document_id)
+
+    return jsonify({
+        "success": True,
+        "data": {
+            "documentId": document_id,
+            "status": document.get("status"),
+            "error": document.get("error"),
+            "totalChunks": document.get("totalChunks"),
+            "job": {
+                "status": job["status"],
+                "attempts": job["attempts"],
+                "progress": job["progress"],
+                "error": job.get("error")
+            } if job else None
+        }
+    }), 200
+
+
+def _upload_session_data(session: dict) -> dict:
+    return {
+        "uploadId": str(session["_id"]),
+        "status": session["status"],
+        "size": session["size"],
+        "partSize": session["partSize"],
+        "totalParts": session["totalParts"],
+        "receivedParts": sorted(session["receivedParts"]),
+        "documentId": str(session["documentId"]) if session.get("documentId") else None
+    }
+
+
+@documents_bp.route("/uploads", methods=["POST"])
+@jwt_required()
+@limiter.limit("10 per minute")
+def initiate_upload():
+    """
+    Start a resumable upload: {filename, size, mimetype}. The response gives
+    the part size and count; PUT each part to /uploads/<id>/parts/<n> as the
+    raw request body, then POST /uploads/<id>/complete.
+    """
+    data = request.get_json(silent=True) or {}
+
+    try:
+        session = upload_service.initiate(
+            request.user["userId"],
+            data.get("filename"),
+            data.get("size"),
+            data.get("mimetype")
+        )
+    except UploadError as e:
+        return jsonify({"success": False, "message": str(e)}), e.status
+    except IngestionQueueFull as e:
+        return jsonify({"success": False, "message": str(e)}), 503
+
+    return jsonify({
+        "success": True,
+        "data": _upload_session_data(session)
+    }), 201
+
+
+@documents_bp.route("/uploads/<upload_id>", methods=["GET"])
+@jwt_required()
+@limiter.limit("60 per minute")
+def upload_status(upload_id):
+    """
+    Received parts of an upload, used by clients to resume
+    """
+    try:
+        session = upload_service.get(upload_id, request.user["userId"])
+    except UploadError as e:
+        return jsonify({"success": False, "message": str(e)}), e.status
+
+    return jsonify({
+        "success": True,
+        "data": _upload_session_data(session)
+    }), 200
+
+
+@documents_bp.route("/uploads/<upload_id>/parts/<int:part_number>", methods=["PUT"])
+@jwt_required()
+@limiter.limit("600 per minute")
+def upload_part(upload_id, part_number):
+    try:
+        session = upload_service.write_part(
+            upload_id,
+            request.user["userId"],
+            part_number,
+            request.stream,
+            request.content_length
+        )
+    except UploadError as e:
+        return jsonify({"success": False, "message": str(e)}), e.status
+
+    return jsonify({
+        "success": True,
+        "data": {
+            "uploadId": upload_id,
+            "partNumber": part_number,
+            "receivedParts": len(session["receivedParts"]),
+            "totalParts": session["totalParts"]
+        }
+    }), 200
+
+
+@documents_bp.route("/uploads/<upload_id>/complete", methods=["POST"])
+@jwt_required()
+@limiter.limit("10 per minute")
+def complete_upload(upload_id):
+    try:
+        result = upload_service.complete(upload_id, request.user["userId"])
+    except UploadError as e:
+        return jsonify({"success": False, "message": str(e)}), e.status
+    except IngestionQueueFull as e:
+        return jsonify({"success": False, "message": str(e)}), 503
+
+    return jsonify({
+        "success": True,
+        "data": {
+            "documentId": result["documentId"],
+            "status": "processing"
+        }
+    }), 200
+
+
+@documents_bp.route("/uploads/<upload_id>", methods=["DELETE"])
+@jwt_required()
+@limiter.limit("10 per minute")
+def abort_upload(upload_id):
+    try:
+        upload_service.abort(upload_id, request.user["userId"])
+    except UploadError as e:
+        return jsonify({"success": False, "message": str(e)}), e.status
+
+    return jsonify({"success": True, "message": "Upload aborted"}), 200
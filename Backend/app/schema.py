@@ -0,0 +1,198 @@
+"""
+Index declarations for every Mongo collection and a verifier that explains
+the hot queries and fails when any of them falls back to a collection scan.
+
+    flask --app run verify-indexes
+    flask --app run reconcile-stats
+"""
+import sys
+from datetime import datetime
+
+import click
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from app.config import Config
+
+
+INDEXES = {
+    "users": [
+        ([("email", ASCENDING)], {"name": "email_unique", "unique": True}),
+        ([("createdAt", DESCENDING), ("_id", DESCENDING)], {"name": "createdAt_id"}),
+    ],
+    "documents": [
+        ([("userId", ASCENDING), ("createdAt", DESCENDING)], {"name": "userId_createdAt"}),
+        ([("createdAt", DESCENDING), ("_id", DESCENDING)], {"name": "createdAt_id"}),
+        ([("status", ASCENDING)], {"name": "status"}),
+        ([("userId", ASCENDING), ("contentHash", ASCENDING)], {"name": "userId_contentHash"}),
+    ],
+    "documents_chunk": [
+        ([("vectorId", ASCENDING), ("userId", ASCENDING), ("documentId", ASCENDING)], {"name": "vectorId_userId_documentId"}),
+        ([("documentId", ASCENDING), ("chunkIndex", ASCENDING)], {"name": "documentId_chunkIndex"}),
+    ],
+    "chat_messages": [
+        ([("userId", ASCENDING), ("documentId", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)], {"name": "userId_documentId_createdAt_id"}),
+        ([("userId", ASCENDING), ("createdAt", DESCENDING)], {"name": "userId_createdAt"}),
+        ([("createdAt", DESCENDING), ("_id", DESCENDING)], {"name": "createdAt_id"}),
+    ],
+    "usage_logs": [
+        ([("userId", ASCENDING), ("createdAt", DESCENDING)], {"name": "userId_createdAt"}),
+        ([("createdAt", DESCENDING)], {"name": "createdAt"}),
+    ],
+    "ingestion_jobs": [
+        ([("status", ASCENDING), ("runAfter", ASCENDING)], {"name": "status_runAfter"}),
+        ([("status", ASCENDING), ("heartbeatAt", ASCENDING)], {"name": "status_heartbeatAt"}),
+        ([("documentId", ASCENDING), ("createdAt", DESCENDING)], {"name": "documentId_createdAt"}),
+        # At most one queued or running job per document
+        ([("documentId", ASCENDING)], {
+            "name": "documentId_active_unique",
+            "unique": True,
+            "partialFilterExpression": {"active": True}
+        }),
+    ],
+    "usage_rollups": [
+        ([("granularity", ASCENDING), ("bucket", ASCENDING), ("userId", ASCENDING), ("model", ASCENDING), ("type", ASCENDING)],
+         {"name": "granularity_bucket_userId_model_type", "unique": True}),
+        ([("bucket", ASCENDING)], {
+            "name": "hourly_bucket_ttl",
+            "expireAfterSeconds": Config.USAGE_HOURLY_RETENTION_DAYS * 86400,
+            "partialFilterExpression": {"granularity": "hour"}
+        }),
+    ],
+    "upload_sessions": [
+        ([("userId", ASCENDING), ("createdAt", DESCENDING)], {"name": "userId_createdAt"}),
+        ([("status", ASCENDING), ("expiresAt", ASCENDING)], {"name": "status_expiresAt"}),
+    ],
+    "embedding_cache": [
+        ([("model", ASCENDING)], {"name": "model"}),
+    ],
+}
+
+
+def ensure_indexes(db):
+    """
+    Create every declared index, safe to run on each startup
+    """
+    for collection_name, indexes in INDEXES.items():
+        collection = db[collection_name]
+
+        for keys, options in indexes:
+            try:
+                collection.create_index(keys, **options)
+            except OperationFailure as e:
+                print(f"Index {collection_name}.{options['name']} not created: {e}")
+
+
+def _hot_queries():
+    """
+    (label, collection, filter, sort) for every query the API runs per request.
+    The $lookup stages in routes/admin.py run after $limit and are covered by
+    the users _id index.
+    """
+    any_id = ObjectId()
+    now = datetime.utcnow()
+
+    return [
+        ("chunk hydration", "documents_chunk",
+         {"vectorId": {"$in": [f"{any_id}_0"]}, "userId": any_id}, None),
+        ("chunk cleanup", "documents_chunk",
+         {"documentId": any_id}, None),
+        ("chat history", "chat_messages",
+         {"userId": any_id, "documentId": any_id}, [("createdAt", DESCENDING), ("_id", DESCENDING)]),
+        ("admin user queries", "chat_messages",
+         {"userId": any_id}, [("createdAt", DESCENDING)]),
+        ("admin queries listing", "chat_messages",
+         {}, [("createdAt", DESCENDING), ("_id", DESCENDING)]),
+        ("queries today", "chat_messages",
+         {"createdAt": {"$gte": now}}, None),
+        ("user documents", "documents",
+         {"userId": any_id}, [("createdAt", DESCENDING)]),
+        ("admin documents listing", "documents",
+         {}, [("createdAt", DESCENDING), ("_id", DESCENDING)]),
+        ("reusable document", "documents",
+         {"userId": any_id, "contentHash": "0" * 64, "status": "processed"}, [("createdAt", DESCENDING)]),
+        ("processing documents", "documents",
+         {"status": "processing"}, None),
+        ("user by email", "users",
+         {"email": "nobody@example.com"}, None),
+        ("admin users listing", "users",
+         {}, [("createdAt", DESCENDING), ("_id", DESCENDING)]),
+        ("usage by user", "usage_logs",
+         {"userId": any_id}, None),
+        ("usage rollups range", "usage_rollups",
+         {"granularity": "day", "bucket": {"$gte": now}}, None),
+        ("expired uploads", "upload_sessions",
+         {"status": "uploading", "expiresAt": {"$lt": now}}, None),
+        ("claim ingestion job", "ingestion_jobs",
+         {"status": "queued", "runAfter": {"$lte": now}}, [("runAfter", ASCENDING)]),
+        ("latest ingestion job", "ingestion_jobs",
+         {"documentId": any_id}, [("createdAt", DESCENDING)]),
+    ]
+
+
+def _stages(plan):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _stages(item)
+
+
+def verify_indexes(db) -> list:
+    """
+    Explain each hot query, returns the labels of those using a COLLSCAN
+    """
+    failures = []
+
+    for label, collection_name, query, sort in _hot_queries():
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+
+        winning_plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        stages = set(_stages(winning_plan))
+
+        status = "COLLSCAN" if "COLLSCAN" in stages else "ok"
+        print(f"{status:<9} {collection_name:<16} {label}")
+
+        if status != "ok":
+            failures.append(label)
+
+    return failures
+
+
+def register_commands(app):
+    @app.cli.command("verify-indexes")
+    def verify_indexes_command():
+        """Fail if any hot query runs without an index."""
+        import app.extensions as extensions
+
+        if extensions.db is None:
+            click.echo("MongoDB not initialized")
+            sys.exit(1)
+
+        ensure_indexes(extensions.db)
+        failures = verify_indexes(extensions.db)
+
+        if failures:
+            click.echo(f"{len(failures)} queries fall back to a collection scan")
+            sys.exit(1)
+
+        click.echo("All hot queries use an index")
+
+    @app.cli.command("reconcile-stats")
+    def reconcile_stats_command():
+        """Rebuild the dashboard counters from the raw collections."""
+        import app.extensions as extensions
+        from app.services.stats_service import stats_service
+
+        if extensions.db is None:
+            click.echo("MongoDB not initialized")
+            sys.exit(1)
+
+        for name, value in stats_service.reconcile().items():
+            click.echo(f"{name}: {value}")
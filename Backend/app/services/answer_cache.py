@@ -0,0 +1,119 @@
+import threading
+import time
+
+import numpy as np
+
+from app.config import Config
+from app.utils.lru_cache import LRUCache
+
+
+class _DocumentAnswers:
+    """
+    Cached answers of one (user, document) pair, oldest first
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = []
+
+
+class AnswerCache:
+    """
+    Semantic answer cache scoped to (userId, documentId, version).
+
+    version is the document's version field, bumped in Mongo whenever its
+    content or visibility changes, so answers cached by any process for the
+    old content stop matching; invalidate_document only frees the memory
+    of the current process.
+
+    A question is answered from the cache when the cosine similarity between
+    its embedding and a cached question's embedding reaches
+    ANSWER_CACHE_THRESHOLD. Documents are evicted LRU, entries inside a
+    document expire after ANSWER_CACHE_TTL_SECONDS and are capped at
+    ANSWER_CACHE_PER_DOCUMENT.
+    """
+
+    def __init__(self):
+        self.documents = LRUCache(Config.ANSWER_CACHE_DOCUMENTS)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _record(self, hit: bool):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def lookup(self, user_id: str, document_id: str, embedding, version: int = 0):
+        """
+        Returns the cached answer for the closest question above the threshold, or None
+        """
+        if not Config.ANSWER_CACHE_ENABLED:
+            return None
+
+        answers = self.documents.get((str(user_id), str(document_id), version))
+        if answers is None:
+            self._record(False)
+            return None
+
+        query = self._normalize(embedding)
+        expires_before = time.monotonic() - Config.ANSWER_CACHE_TTL_SECONDS
+
+        with answers.lock:
+            answers.entries = [e for e in answers.entries if e["createdAt"] >= expires_before]
+
+            best = None
+            best_score = Config.ANSWER_CACHE_THRESHOLD
+            for entry in answers.entries:
+                score = float(entry["embedding"] @ query)
+                if score >= best_score:
+                    best, best_score = entry, score
+
+        self._record(best is not None)
+        return best["answer"] if best else None
+
+    def store(self, user_id: str, document_id: str, question: str, embedding, answer: str, version: int = 0):
+        if not Config.ANSWER_CACHE_ENABLED:
+            return
+
+        key = (str(user_id), str(document_id), version)
+        answers = self.documents.get(key)
+        if answers is None:
+            answers = _DocumentAnswers()
+            self.documents.set(key, answers)
+
+        with answers.lock:
+            answers.entries.append({
+                "question": question,
+                "embedding": self._normalize(embedding),
+                "answer": answer,
+                "createdAt": time.monotonic()
+            })
+            del answers.entries[:-Config.ANSWER_CACHE_PER_DOCUMENT]
+
+    def invalidate_document(self, document_id: str):
+        document_id = str(document_id)
+        self.documents.discard_where(lambda key: key[1] == document_id)
+
+    def stats(self) -> dict:
+        with self.lock:
+            hits, misses = self.hits, self.misses
+
+        lookups = hits + misses
+        return {
+            "documents": len(self.documents),
+            "hits": hits,
+            "misses": misses,
+            "hitRate": round(hits / lookups, 4) if lookups else 0.0
+        }
+
+
+answer_cache = AnswerCache()
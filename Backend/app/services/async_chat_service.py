@@ -0,0 +1,81 @@
+from bson import ObjectId
+
+from app.services.chat_service import ChatService, NO_CONTEXT_ANSWER
+from app.services.answer_cache import answer_cache
+
+
+class AsyncChatService(ChatService):
+    """
+    The ask_question flow on asyncio. Ollama calls and chunk hydration are
+    awaited on async clients, the vector query runs on the default executor,
+    so a waiting question holds a coroutine instead of a worker thread.
+    Prompt, caches and persistence are shared with ChatService.
+    """
+
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+
+    async def _aretrieve_context(
+        self,
+        question_embedding: list,
+        user_id: str,
+        document_id: str,
+        top_k: int,
+        version: int = 0
+    ):
+        results = await self.vector_service.store.aquery(
+            question_embedding,
+            user_id=user_id,
+            document_id=document_id,
+            top_k=top_k
+        )
+
+        if not results.matches:
+            return None, None
+
+        chunks = await self.chunk_store.afetch(
+            self.db,
+            [match["id"] for match in results.matches],
+            user_id,
+            {document_id: version}
+        )
+
+        return self._pack(chunks, [document_id])
+
+    async def aask_question(
+        self,
+        question: str,
+        user_id: str,
+        document_id: str,
+        top_k: int = 5,
+        version: int = 0
+    ):
+        question_embedding = await self.embedding_service.aembed_text(question, user_id=user_id)
+
+        answer = answer_cache.lookup(user_id, document_id, question_embedding, version)
+        cached = answer is not None
+        context_stats = None
+
+        if not cached:
+            context, context_stats = await self._aretrieve_context(
+                question_embedding, user_id, document_id, top_k, version
+            )
+
+            if context is None:
+                answer = NO_CONTEXT_ANSWER
+            else:
+                answer = await self.embedding_service.agenerate_answer(
+                    self._build_prompt(context, question),
+                    ObjectId(user_id)
+                )
+
+                answer_cache.store(user_id, document_id, question, question_embedding, answer, version)
+
+        self._save_message(question, answer, user_id, document_id)
+
+        return {
+            "answer": answer,
+            "cached": cached,
+            "promptTokensSaved": context_stats["promptTokensSaved"] if context_stats else 0
+        }
@@ -0,0 +1,94 @@
+import asyncio
+
+import aiohttp
+
+from app.config import Config
+from app.services.ollama_client import CircuitBreaker, OllamaError, RETRYABLE_STATUS
+
+
+class AsyncOllamaClient:
+    """
+    asyncio counterpart of OllamaClient: one aiohttp session with keep-alive
+    connections, at most OLLAMA_MAX_CONCURRENCY requests sent to Ollama and
+    the same retry and circuit breaker rules. Callers waiting for a slot are
+    coroutines, not threads, so hundreds of them cost almost nothing.
+    """
+
+    def __init__(self, base_url: str = None):
+        self.base_url = (base_url or Config.OLLAMA_BASE_URL).rstrip("/")
+        self.session = None
+        self.semaphore = None
+        self.breaker = CircuitBreaker(
+            Config.OLLAMA_BREAKER_THRESHOLD,
+            Config.OLLAMA_BREAKER_RESET_SECONDS
+        )
+
+    async def start(self):
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=Config.OLLAMA_MAX_CONCURRENCY)
+            )
+            self.semaphore = asyncio.Semaphore(Config.OLLAMA_MAX_CONCURRENCY)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _acquire(self):
+        if not self.breaker.allow():
+            raise OllamaError("Ollama circuit breaker is open, service unavailable")
+
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), Config.ASYNC_OLLAMA_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.breaker.cancel_trial()
+            raise OllamaError("Too many concurrent Ollama requests")
+
+    async def _send(self, path: str, payload: dict, timeout) -> dict:
+        url = f"{self.base_url}{path}"
+        attempt = 0
+
+        while True:
+            try:
+                async with self.session.post(
+                    url,
+                    json=payload,
+                    timeout=aiohttp.ClientTimeout(total=timeout)
+                ) as response:
+                    if response.status not in RETRYABLE_STATUS:
+                        response.raise_for_status()
+                        return await response.json(content_type=None)
+
+                    error = OllamaError(f"Ollama returned HTTP {response.status}")
+
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error = OllamaError(str(e) or type(e).__name__)
+            except aiohttp.ClientError as e:
+                raise OllamaError(str(e))
+
+            if attempt >= Config.OLLAMA_MAX_RETRIES:
+                raise error
+
+            await asyncio.sleep(Config.OLLAMA_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+            attempt += 1
+
+    async def post(self, path: str, payload: dict, timeout) -> dict:
+        await self.start()
+        await self._acquire()
+        try:
+            data = await self._send(path, payload, timeout)
+        except ValueError:
+            self.breaker.record_failure()
+            raise OllamaError(f"Invalid JSON from Ollama {path}")
+        except OllamaError:
+            self.breaker.record_failure()
+            raise
+        finally:
+            self.semaphore.release()
+
+        self.breaker.record_success()
+        return data
+
+
+async_ollama_client = AsyncOllamaClient()
@@ -1,9 +1,11 @@
 import jwt
 from datetime import datetime, timedelta
-from werkzeug.security import generate_password_hash, check_password_hash
+from pymongo.errors import DuplicateKeyError
 
 import app.extensions as extensions
 from app.config import Config
+from app.services.stats_service import stats_service
+from app.services.password_hasher import password_hasher
 
 
 class AuthService:
@@ -15,12 +17,21 @@ class AuthService:
         user = {
             "name": name,
             "email": email,
-            "password": generate_password_hash(password),  
+            "password": password_hasher.hash(password),
             "role": "user",
+            "documentCount": 0,
+            "queryCount": 0,
+            "tokenCount": 0,
             "createdAt": datetime.utcnow()
         }
 
-        extensions.db.users.insert_one(user)
+        # The email_unique index settles two registrations racing past find_one
+        try:
+            extensions.db.users.insert_one(user)
+        except DuplicateKeyError:
+            raise ValueError("User already exists")
+
+        stats_service.increment(totalUsers=1)
 
         return {"message": "User registered successfully"}
 
@@ -35,9 +46,18 @@ class AuthService:
         if isinstance(stored_password, bytes):
             stored_password = stored_password.decode("utf-8")
 
-        if not check_password_hash(stored_password, password):
+        matches, new_hash = password_hasher.verify(stored_password, password)
+
+        if not matches:
             raise ValueError("Invalid email or password")
 
+        if new_hash:
+            # Parameters changed since this hash was made, upgrade it in place
+            extensions.db.users.update_one(
+                {"_id": user["_id"], "password": user["password"]},
+                {"$set": {"password": new_hash}}
+            )
+
         payload = {
             "userId": str(user["_id"]),
             "email": user["email"],
@@ -1,63 +1,79 @@
 import app.extensions as extensions
 from app.services.embedding_service import EmbeddingService
 from app.services.vector_service import VectorService
+from app.services.chunk_store import ChunkStore
+from app.services.write_buffer import write_buffer
+from app.services.answer_cache import answer_cache
+from app.config import Config
+from app.utils.context_packer import pack_context
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from bson import ObjectId
 
 
+NO_CONTEXT_ANSWER = "No relevant information found for this document."
+
+
 class ChatService:
     def __init__(self):
         self.embedding_service = EmbeddingService()
         self.vector_service = VectorService()
+        self.chunk_store = ChunkStore()
 
-    def ask_question(
+    def _retrieve_context(
         self,
-        question: str,
+        question_embedding: list,
         user_id: str,
         document_id: str,
-        top_k: int = 5
+        top_k: int,
+        version: int = 0
     ):
-        print("\nNew question received")
-
-        if extensions.db is None:
-            raise RuntimeError("MongoDB not initialized")
-
-        print("Searching relevant chunks in Pinecone")
-        results = self.vector_service.search(
-            query=question,
+        """
+        Returns the packed context and its token stats, (None, None) when nothing matched
+        """
+        print("Searching relevant chunks in vector store")
+        results = self.vector_service.search_by_vector(
+            question_embedding,
             user_id=user_id,
             document_id=document_id,
             top_k=top_k
         )
 
         if not results.matches:
-            answer = "No relevant information found for this document."
-        else:
-            chunk_texts = []
-
-            for match in results.matches:
-                vector_id = match["id"]
-
-                chunk = extensions.db.documents_chunk.find_one(
-                    {
-                        "vectorId": vector_id,
-                        "userId": ObjectId(user_id),
-                        "documentId": ObjectId(document_id)
-                    },
-                    {"_id": 0}
-                )
+            return None, None
 
-                if chunk:
-                    chunk_texts.append(chunk["text"])
+        chunks = self.chunk_store.fetch(
+            [match["id"] for match in results.matches],
+            user_id,
+            {document_id: version}
+        )
 
-            if not chunk_texts:
-                answer = "No relevant information found for this document."
-            else:
-                context = "\n\n".join(chunk_texts)
+        return self._pack(chunks, [document_id])
 
-                print("Asking LLM with retrieved context")
+    def _pack(self, chunks: list, document_ids: list):
+        """
+        Packs the hydrated chunks that belong to document_ids, (None, None) when there are none
+        """
+        allowed = {str(document_id) for document_id in document_ids}
+        chunks = [
+            chunk for chunk in chunks
+            if chunk["documentId"] in allowed
+        ]
 
-                prompt = f"""
+        if not chunks:
+            return None, None
+
+        context, stats = pack_context(
+            chunks,
+            Config.CONTEXT_TOKEN_BUDGET,
+            known_overlap=Config.CHUNK_OVERLAP if Config.CHUNKER == "fixed" else None
+        )
+        print(f"Context packed: {stats['promptTokens']} tokens, {stats['promptTokensSaved']} saved")
+
+        return context, stats
+
+    def _build_prompt(self, context: str, question: str) -> str:
+        return f"""
 You are a smart, friendly AI assistant like ChatGPT.
 
 Follow these rules carefully:
@@ -99,22 +115,293 @@ User Question:
 Answer:
 """
 
+    def _save_message(self, question: str, answer: str, user_id: str, document_id: str):
+        write_buffer.add_chat_message({
+            "userId": ObjectId(user_id),
+            "documentId": ObjectId(document_id),
+            "question": question,
+            "answer": answer,
+            "createdAt": datetime.utcnow()
+        })
+
+        print("Chat queued for saving")
+
+    def ask_question(
+        self,
+        question: str,
+        user_id: str,
+        document_id: str,
+        top_k: int = 5,
+        version: int = 0
+    ):
+        print("\nNew question received")
+
+        if extensions.db is None:
+            raise RuntimeError("MongoDB not initialized")
+
+        question_embedding = self.embedding_service.embed_text(question, user_id=user_id)
+
+        answer = answer_cache.lookup(user_id, document_id, question_embedding, version)
+        cached = answer is not None
+        context_stats = None
+
+        if cached:
+            print("Answer served from semantic cache")
+        else:
+            context, context_stats = self._retrieve_context(
+                question_embedding, user_id, document_id, top_k, version
+            )
+
+            if context is None:
+                answer = NO_CONTEXT_ANSWER
+            else:
+                print("Asking LLM with retrieved context")
+
                 answer = self.embedding_service.generate_answer(
-                    prompt,
+                    self._build_prompt(context, question),
                     ObjectId(user_id)   # 🔥 TOKEN USAGE TRACKED
                 )
 
-        extensions.db.chat_messages.insert_one({
+                answer_cache.store(user_id, document_id, question, question_embedding, answer, version)
+
+        self._save_message(question, answer, user_id, document_id)
+        print("Answer generated")
+
+        return {
+            "answer": answer,
+            "cached": cached,
+            "promptTokensSaved": context_stats["promptTokensSaved"] if context_stats else 0
+        }
+
+    def ask_questions(
+        self,
+        questions: list,
+        user_id: str,
+        document_id: str,
+        top_k: int = 5,
+        version: int = 0
+    ):
+        """
+        Answer many questions about one document with shared retrieval: one
+        batched embedding call, concurrent vector queries, a single chunk
+        hydration for the union of matches and at most
+        BATCH_GENERATION_WORKERS generations at a time. Returns one result per
+        question, in order; a failed generation only fails its own question.
+        """
+        print(f"\nBatch of {len(questions)} questions received")
+
+        if extensions.db is None:
+            raise RuntimeError("MongoDB not initialized")
+
+        unique = list(dict.fromkeys(questions))
+        embeddings = dict(zip(
+            unique,
+            self.embedding_service.embed_texts(unique, user_id=user_id)
+        ))
+
+        results = {}
+        pending = []
+
+        for question in unique:
+            answer = answer_cache.lookup(user_id, document_id, embeddings[question], version)
+            if answer is not None:
+                results[question] = {"answer": answer, "cached": True, "promptTokensSaved": 0}
+            else:
+                pending.append(question)
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=Config.BATCH_SEARCH_WORKERS) as pool:
+                searches = list(pool.map(
+                    lambda question: self.vector_service.search_by_vector(
+                        embeddings[question],
+                        user_id=user_id,
+                        document_id=document_id,
+                        top_k=top_k
+                    ),
+                    pending
+                ))
+
+            match_ids = {
+                question: [match["id"] for match in search.matches]
+                for question, search in zip(pending, searches)
+            }
+
+            all_ids = list(dict.fromkeys(
+                vector_id for ids in match_ids.values() for vector_id in ids
+            ))
+            chunks_by_id = {
+                chunk["vectorId"]: chunk
+                for chunk in self.chunk_store.fetch(all_ids, user_id, {document_id: version})
+            }
+            print(f"Hydrated {len(chunks_by_id)} chunks for {len(pending)} questions")
+
+            def answer_one(question):
+                chunks = [chunks_by_id[i] for i in match_ids[question] if i in chunks_by_id]
+                context, context_stats = self._pack(chunks, [document_id])
+
+                if context is None:
+                    return {"answer": NO_CONTEXT_ANSWER, "cached": False, "promptTokensSaved": 0}
+
+                try:
+                    answer = self.embedding_service.generate_answer(
+                        self._build_prompt(context, question),
+                        ObjectId(user_id)
+                    )
+                except Exception as e:
+                    print("Batch generation error:", str(e))
+                    return {"error": str(e)}
+
+                answer_cache.store(user_id, document_id, question, embeddings[question], answer, version)
+
+                return {
+                    "answer": answer,
+                    "cached": False,
+                    "promptTokensSaved": context_stats["promptTokensSaved"]
+                }
+
+            with ThreadPoolExecutor(max_workers=Config.BATCH_GENERATION_WORKERS) as pool:
+                for question, result in zip(pending, pool.map(answer_one, pending)):
+                    results[question] = result
+
+        now = datetime.utcnow()
+        write_buffer.add_chat_messages([
+            {
+                "userId": ObjectId(user_id),
+                "documentId": ObjectId(document_id),
+                "question": question,
+                "answer": results[question]["answer"],
+                "createdAt": now
+            }
+            for question in questions
+            if "answer" in results[question]
+        ])
+
+        print("Batch answered")
+
+        return [{"question": question, **results[question]} for question in questions]
+
+    def ask_documents(
+        self,
+        question: str,
+        user_id: str,
+        document_ids: list,
+        top_k: int = None,
+        versions: dict = None
+    ):
+        """
+        Answer one question from several documents: a single embedding, one
+        retrieval over all of them (a $in filter, or a concurrent fan-out on
+        backends without one) and one prompt built from the best matches.
+        versions maps each document id to its version, for the chunk cache.
+        """
+        print(f"\nNew question over {len(document_ids)} documents received")
+
+        if extensions.db is None:
+            raise RuntimeError("MongoDB not initialized")
+
+        question_embedding = self.embedding_service.embed_text(question, user_id=user_id)
+
+        results = self.vector_service.search_documents(
+            question_embedding,
+            user_id=user_id,
+            document_ids=document_ids,
+            top_k=top_k or Config.MULTI_ASK_TOP_K
+        )
+
+        context, context_stats = None, None
+        if results.matches:
+            chunks = self.chunk_store.fetch(
+                [match["id"] for match in results.matches],
+                user_id,
+                versions
+            )
+            context, context_stats = self._pack(chunks, document_ids)
+
+        if context is None:
+            answer = NO_CONTEXT_ANSWER
+            used_documents = []
+        else:
+            answer = self.embedding_service.generate_answer(
+                self._build_prompt(context, question),
+                ObjectId(user_id)
+            )
+            # Only documents that made it into the prompt, best match first
+            used_documents = context_stats["usedDocuments"]
+
+        # An array documentId is matched by the per-document history query,
+        # so the message shows up in the history of every document asked
+        write_buffer.add_chat_message({
             "userId": ObjectId(user_id),
-            "documentId": ObjectId(document_id),
+            "documentId": [ObjectId(document_id) for document_id in document_ids],
+            "sourceDocumentIds": [ObjectId(document_id) for document_id in used_documents],
             "question": question,
             "answer": answer,
             "createdAt": datetime.utcnow()
         })
-
-        print("Chat saved to database")
         print("Answer generated")
 
         return {
-            "answer": answer
+            "answer": answer,
+            "documentIds": used_documents,
+            "promptTokensSaved": context_stats["promptTokensSaved"] if context_stats else 0
         }
+
+    def ask_question_stream(
+        self,
+        question: str,
+        user_id: str,
+        document_id: str,
+        top_k: int = 5,
+        version: int = 0
+    ):
+        """
+        Same flow as ask_question but yields answer tokens as they are generated.
+        The full answer is saved once the stream finishes, the part already
+        streamed when the generator is closed early.
+        """
+        print("\nNew streaming question received")
+
+        if extensions.db is None:
+            raise RuntimeError("MongoDB not initialized")
+
+        question_embedding = self.embedding_service.embed_text(question, user_id=user_id)
+
+        answer = answer_cache.lookup(user_id, document_id, question_embedding, version)
+        context = None
+        if answer is None:
+            context, _ = self._retrieve_context(
+                question_embedding, user_id, document_id, top_k, version
+            )
+
+        if answer is not None:
+            print("Answer served from semantic cache")
+            yield answer
+        elif context is None:
+            answer = NO_CONTEXT_ANSWER
+            yield answer
+        else:
+            print("Streaming LLM answer with retrieved context")
+
+            tokens = []
+            stream = self.embedding_service.stream_answer(
+                self._build_prompt(context, question),
+                ObjectId(user_id)
+            )
+            try:
+                for token in stream:
+                    tokens.append(token)
+                    yield token
+            except GeneratorExit:
+                # The client went away, keep what it was shown; a partial
+                # answer is not cached
+                if tokens:
+                    self._save_message(question, "".join(tokens), user_id, document_id)
+                raise
+            finally:
+                stream.close()
+
+            answer = "".join(tokens)
+            answer_cache.store(user_id, document_id, question, question_embedding, answer, version)
+
+        self._save_message(question, answer, user_id, document_id)
+        print("Streamed answer completed")
@@ -0,0 +1,91 @@
+from bson import ObjectId
+
+import app.extensions as extensions
+from app.config import Config
+from app.utils.lru_cache import LRUCache
+
+
+chunk_cache = LRUCache(Config.CHUNK_CACHE_SIZE)
+
+
+class ChunkStore:
+    """
+    Hydrates vector search matches into chunk rows with one $in query,
+    keeping recently used chunks in an in-process LRU keyed by
+    (vectorId, document version).
+
+    versions maps a document id to the version the caller read from Mongo.
+    Re-ingesting, clearing or toggling a document bumps it, so processes
+    that never see invalidate_document() stop hitting stale rows.
+    """
+
+    @staticmethod
+    def _cache_key(vector_id: str, versions: dict):
+        # Vector ids are "<documentId>_<chunkIndex>"
+        document_id = vector_id.rsplit("_", 1)[0]
+        return vector_id, versions.get(document_id, 0)
+
+    def _split_cached(self, vector_ids: list, user_id: str, versions: dict):
+        found = {}
+        missing = []
+
+        for vector_id in vector_ids:
+            chunk = chunk_cache.get(self._cache_key(vector_id, versions))
+            if chunk is not None and chunk["userId"] == user_id:
+                found[vector_id] = chunk
+            else:
+                missing.append(vector_id)
+
+        return found, missing
+
+    def _query(self, missing: list, user_id: str):
+        return (
+            {
+                "vectorId": {"$in": missing},
+                "userId": ObjectId(user_id)
+            },
+            {"_id": 0, "vectorId": 1, "documentId": 1, "chunkIndex": 1, "text": 1}
+        )
+
+    def _add_row(self, row: dict, user_id: str, versions: dict, found: dict):
+        chunk = {
+            "vectorId": row["vectorId"],
+            "userId": user_id,
+            "documentId": str(row["documentId"]),
+            "chunkIndex": row["chunkIndex"],
+            "text": row["text"]
+        }
+        chunk_cache.set(self._cache_key(chunk["vectorId"], versions), chunk)
+        found[chunk["vectorId"]] = chunk
+
+    def fetch(self, vector_ids: list, user_id: str, versions: dict = None) -> list:
+        """
+        Returns chunk dicts in the order of vector_ids, unknown ids are skipped
+        """
+        user_id = str(user_id)
+        versions = versions or {}
+        found, missing = self._split_cached(vector_ids, user_id, versions)
+
+        if missing:
+            for row in extensions.db.documents_chunk.find(*self._query(missing, user_id)):
+                self._add_row(row, user_id, versions, found)
+
+        return [found[vector_id] for vector_id in vector_ids if vector_id in found]
+
+    async def afetch(self, db, vector_ids: list, user_id: str, versions: dict = None) -> list:
+        """
+        fetch() on an async (AsyncMongoClient) database, sharing the same LRU
+        """
+        user_id = str(user_id)
+        versions = versions or {}
+        found, missing = self._split_cached(vector_ids, user_id, versions)
+
+        if missing:
+            async for row in db.documents_chunk.find(*self._query(missing, user_id)):
+                self._add_row(row, user_id, versions, found)
+
+        return [found[vector_id] for vector_id in vector_ids if vector_id in found]
+
+    def invalidate_document(self, document_id: str):
+        prefix = f"{document_id}_"
+        chunk_cache.discard_where(lambda key: key[0].startswith(prefix))
@@ -3,24 +3,234 @@ from datetime import datetime
 from bson import ObjectId
 
 import app.extensions as extensions
-from app.utils.file_loader import load_text_from_file
-from app.utils.text_chunker import chunk_text
+from app.config import Config
+from app.utils.file_loader import iter_pages
+from app.utils.text_chunker import iter_chunks, iter_structured_chunks
+from app.utils.pipeline import background, batched
+from app.utils.file_store import hash_file
 from app.services.embedding_service import EmbeddingService
 from app.services.vector_service import VectorService
+from app.services.chunk_store import ChunkStore
+from app.services.answer_cache import answer_cache
+from app.services.upload_service import upload_service
+from app.services.ingestion_queue import IngestionDeferred
 
 
 class DocumentService:
     def __init__(self):
         self.embedding_service = EmbeddingService()
         self.vector_service = VectorService()
+        self.chunk_store = ChunkStore()
 
         # MongoDB collections
         self.documents_collection = extensions.db.documents
         self.chunks_collection = extensions.db.documents_chunk
 
-    def ingest_document(self, document_id: str, file_path: str, user_id: str):
+    def clear_document(self, document_id: str, user_id: str):
+        """
+        Remove chunks and vectors left behind by a previous ingestion attempt,
+        bumping the version retires cached answers in every process
+        """
+        self.documents_collection.update_one({"_id": ObjectId(document_id)}, {"$inc": {"version": 1}})
+        self.chunks_collection.delete_many({"documentId": ObjectId(document_id)})
+        self.vector_service.delete_document(user_id, document_id)
+        self.chunk_store.invalidate_document(document_id)
+        answer_cache.invalidate_document(document_id)
+
+    def _chunker(self, pages):
+        if Config.CHUNKER == "fixed":
+            return iter_chunks(pages, Config.CHUNK_SIZE, Config.CHUNK_OVERLAP)
+
+        return iter_structured_chunks(
+            pages,
+            Config.CHUNK_MAX_TOKENS,
+            Config.CHUNK_OVERLAP_TOKENS
+        )
+
+    def chunk_config(self) -> dict:
+        """
+        Everything that decides a document's chunks and vectors, two
+        documents with the same bytes and chunk_config share them
+        """
+        if Config.CHUNKER == "fixed":
+            params = {"size": Config.CHUNK_SIZE, "overlap": Config.CHUNK_OVERLAP}
+        else:
+            params = {"maxTokens": Config.CHUNK_MAX_TOKENS, "overlapTokens": Config.CHUNK_OVERLAP_TOKENS}
+
+        return {
+            "chunker": Config.CHUNKER,
+            **params,
+            "embedModel": self.embedding_service.embed_model
+        }
+
+    def _find_reusable_source(self, document_id: str, user_id: str, content_hash: str, chunk_config: dict):
+        return self.documents_collection.find_one(
+            {
+                "userId": ObjectId(user_id),
+                "contentHash": content_hash,
+                "status": "processed",
+                "chunkConfig": chunk_config,
+                "_id": {"$ne": ObjectId(document_id)}
+            },
+            {"_id": 1, "totalChunks": 1},
+            sort=[("createdAt", -1)]
+        )
+
+    def _copy_from_source(self, source: dict, document_id: str, user_id: str, filename: str) -> int:
+        """
+        Copy the chunk rows and vectors of an already processed document with
+        the same content, returns the number of chunks or 0 when the source
+        turned out to be incomplete (its copies are then cleared again)
+        """
+        source_id = source["_id"]
+        doc_object_id = ObjectId(document_id)
+        copied_chunks = 0
+
+        rows = self.chunks_collection.find(
+            {"documentId": source_id},
+            {"_id": 0, "chunkIndex": 1, "pageNumber": 1, "text": 1}
+        ).sort("chunkIndex", 1)
+
+        for batch in batched(rows, Config.VECTOR_UPSERT_BATCH_SIZE):
+            now = datetime.utcnow()
+            self.chunks_collection.insert_many([
+                {
+                    "userId": ObjectId(user_id),
+                    "documentId": doc_object_id,
+                    "chunkIndex": row["chunkIndex"],
+                    "pageNumber": row.get("pageNumber"),
+                    "text": row["text"],
+                    "vectorId": f"{document_id}_{row['chunkIndex']}",
+                    "createdAt": now
+                }
+                for row in batch
+            ])
+            copied_chunks += len(batch)
+
+        copied_vectors = self.vector_service.copy_document(user_id, source_id, document_id, filename)
+
+        expected = source.get("totalChunks")
+        if not copied_chunks or copied_vectors != copied_chunks or (expected and copied_chunks != expected):
+            print(f"Source {source_id} is incomplete, ingesting from scratch")
+            self.clear_document(document_id, user_id)
+            return 0
+
+        return copied_chunks
+
+    def _numbered_chunks(self, pages, first_index: int = 0):
+        index = first_index
+        for page_number, chunk in self._chunker(pages):
+            if chunk.strip():
+                yield index, page_number, chunk
+                index += 1
+
+    def _embed_batches(self, batches, user_id: str):
+        for batch in batches:
+            embeddings = self.embedding_service.embed_texts(
+                [chunk for _, _, chunk in batch],
+                user_id=user_id
+            )
+            yield batch, embeddings
+
+    def _write_chunks(
+        self,
+        pages,
+        document_id: str,
+        user_id: str,
+        filename: str,
+        first_index: int = 0,
+        progress_callback=None
+    ) -> int:
+        """
+        Chunk, embed and write pages through overlapping stages joined with
+        bounded queues, returns the number of chunks written
+        """
+        doc_object_id = ObjectId(document_id)
+        batch_size = Config.EMBED_BATCH_SIZE
+        chunks = background(
+            self._numbered_chunks(pages, first_index),
+            maxsize=batch_size * Config.PIPELINE_QUEUE_BATCHES,
+            name="ingest-chunker"
+        )
+        embedded = background(
+            self._embed_batches(batched(chunks, batch_size), user_id),
+            maxsize=Config.PIPELINE_QUEUE_BATCHES,
+            name="ingest-embedder"
+        )
+
+        upsert_size = Config.VECTOR_UPSERT_BATCH_SIZE
+        pending = []
+        written = 0
+
+        def flush(count: int):
+            nonlocal written
+            rows = pending[:count]
+            del pending[:count]
+
+            self.chunks_collection.insert_many([row for row, _ in rows])
+            self.vector_service.upsert_embeddings(
+                vector_ids=[row["vectorId"] for row, _ in rows],
+                embeddings=[embedding for _, embedding in rows],
+                user_id=user_id,
+                metadatas=[
+                    {
+                        "documentId": str(document_id),
+                        "chunkIndex": row["chunkIndex"],
+                        "pageNumber": row["pageNumber"],
+                        "filename": filename
+                    }
+                    for row, _ in rows
+                ]
+            )
+
+            written += len(rows)
+            print(f"Processed {first_index + written} chunks")
+
+            if progress_callback:
+                progress_callback(first_index + written, None)
+
+        try:
+            # Embedding batches are gathered into VECTOR_UPSERT_BATCH_SIZE
+            # writes, chunk rows go out with their vectors
+            for batch, embeddings in embedded:
+                now = datetime.utcnow()
+                pending.extend(
+                    ({
+                        "userId": ObjectId(user_id),
+                        "documentId": doc_object_id,
+                        "chunkIndex": index,
+                        "pageNumber": page_number,
+                        "text": chunk,
+                        "vectorId": f"{document_id}_{index}",
+                        "createdAt": now
+                    }, embedding)
+                    for (index, page_number, chunk), embedding in zip(batch, embeddings)
+                )
+
+                while len(pending) >= upsert_size:
+                    flush(upsert_size)
+
+            if pending:
+                flush(len(pending))
+        finally:
+            embedded.close()
+
+        return written
+
+    def ingest_document(
+        self,
+        document_id: str,
+        file_path: str,
+        user_id: str,
+        progress_callback=None
+    ):
         """
         Full document ingestion pipeline (USER-SCOPED)
+
+        Pages are extracted, chunked, embedded and written by overlapping
+        stages joined with bounded queues, so memory does not grow with the
+        size of the document. progress_callback(done, total) is called after
+        every written batch, total stays None until the last batch.
         """
         print("\n Starting document ingestion")
 
@@ -29,56 +239,141 @@ class DocumentService:
 
         filename = os.path.basename(file_path)
 
-        text = load_text_from_file(file_path)
-        if not text.strip():
-            raise ValueError("Empty document text")
+        document = self.documents_collection.find_one(
+            {"_id": ObjectId(document_id)},
+            {"contentHash": 1, "uploadId": 1, "ingestedBytes": 1, "totalChunks": 1}
+        ) or {}
+
+        # A resumable TXT upload is ingested in steps as its parts land
+        if document.get("ingestedBytes") is not None:
+            return self._ingest_upload_step(
+                document, document_id, file_path, user_id, filename, progress_callback
+            )
 
-        print(f"Extracted text length: {len(text)} characters")
+        self.clear_document(document_id, user_id)
 
-        chunks = chunk_text(text)
-        print(f"Created {len(chunks)} chunks")
+        if progress_callback:
+            progress_callback(0, None)
 
-        doc_object_id = ObjectId(document_id)
-        
+        chunk_config = self.chunk_config()
+        content_hash = document.get("contentHash") or hash_file(file_path)
 
-        
+        source = self._find_reusable_source(document_id, user_id, content_hash, chunk_config)
 
-        print(f"Document saved (id={document_id})")
+        if source:
+            print(f"Same content as document {source['_id']}, reusing its chunks and vectors")
+            total_chunks = self._copy_from_source(source, document_id, user_id, filename)
 
-        for index, chunk_text_data in enumerate(chunks):
-            chunk_id = f"{document_id}_{index}"
+            if total_chunks:
+                return self._mark_processed(
+                    document_id, filename, total_chunks, content_hash, chunk_config,
+                    progress_callback, reused_from=source["_id"]
+                )
 
-            self.chunks_collection.insert_one({
-                "userId": ObjectId(user_id),
-                "documentId": doc_object_id,
-                "chunkIndex": index,
-                "text": chunk_text_data,
-                "vectorId": chunk_id,
-                "createdAt": datetime.utcnow()
+        total_chunks = self._write_chunks(
+            iter_pages(file_path), document_id, user_id, filename,
+            progress_callback=progress_callback
+        )
+
+        if total_chunks == 0:
+            raise ValueError("Empty document text")
+
+        return self._mark_processed(
+            document_id, filename, total_chunks, content_hash, chunk_config, progress_callback
+        )
+
+    def _ingest_upload_step(
+        self,
+        document: dict,
+        document_id: str,
+        file_path: str,
+        user_id: str,
+        filename: str,
+        progress_callback=None
+    ):
+        """
+        Ingest the paragraphs of an upload that arrived since the last step,
+        then raise IngestionDeferred until the upload has every byte, so no
+        worker sits waiting for parts. Steps start the chunker on a paragraph
+        break; chunks do not overlap across two steps.
+        """
+        start = document["ingestedBytes"]
+        total_chunks = document.get("totalChunks") or 0
+
+        # Drop whatever a step that failed midway wrote past the saved progress
+        if start == 0:
+            self.clear_document(document_id, user_id)
+        else:
+            self.chunks_collection.delete_many({
+                "documentId": ObjectId(document_id),
+                "chunkIndex": {"$gte": total_chunks}
             })
 
-            self.vector_service.add_text(
-                text=chunk_text_data,
-                vector_id=chunk_id,
-                user_id=user_id,
-                metadata={
-                    "documentId": str(document_id),
-                    "chunkIndex": index,
-                    "filename": filename
-                }
-            )
+        while True:
+            end, final = upload_service.ingestable_range(document["uploadId"], start)
+            progressed = end > start
 
-            if (index + 1) % 5 == 0 or index == len(chunks) - 1:
-                print(f"Processed {index + 1}/{len(chunks)} chunks")
+            if progressed:
+                total_chunks += self._write_chunks(
+                    upload_service.iter_range(file_path, start, end),
+                    document_id, user_id, filename,
+                    first_index=total_chunks,
+                    progress_callback=progress_callback
+                )
+                start = end
 
-        self.documents_collection.update_one(
-            {"_id": doc_object_id},
-            {
-             "$set": {
+                self.documents_collection.update_one(
+                    {"_id": ObjectId(document_id)},
+                    {"$set": {"ingestedBytes": start, "totalChunks": total_chunks}}
+                )
+
+            if final:
+                break
+
+            if not progressed:
+                raise IngestionDeferred(
+                    f"Ingested {start} bytes, waiting for more parts",
+                    Config.UPLOAD_INGEST_POLL_SECONDS
+                )
+
+        if total_chunks == 0:
+            raise ValueError("Empty document text")
+
+        # complete() stores the hash, possibly after the last step
+        content_hash = self.documents_collection.find_one(
+            {"_id": ObjectId(document_id)},
+            {"contentHash": 1}
+        ).get("contentHash")
+
+        return self._mark_processed(
+            document_id, filename, total_chunks, content_hash, self.chunk_config(), progress_callback
+        )
+
+    def _mark_processed(
+        self,
+        document_id: str,
+        filename: str,
+        total_chunks: int,
+        content_hash: str,
+        chunk_config: dict,
+        progress_callback=None,
+        reused_from=None
+    ):
+        if progress_callback:
+            progress_callback(total_chunks, total_chunks)
+
+        fields = {
             "status": "processed",
-            "totalChunks": len(chunks)
-            }
-            }
+            "totalChunks": total_chunks,
+            "chunkConfig": chunk_config,
+            "reusedFrom": reused_from
+        }
+        if content_hash:
+            fields["contentHash"] = content_hash
+
+        self.documents_collection.update_one(
+            {"_id": ObjectId(document_id)},
+            {"$set": fields, "$unset": {"ingestedBytes": ""}, "$inc": {"version": 1}}
 )        
 
         print("Document ingestion completed\n")
@@ -86,6 +381,6 @@ class DocumentService:
         return {
             "documentId": str(document_id),
             "filename": filename,
-            "totalChunks": len(chunks),
+            "totalChunks": total_chunks,
             "status": "processed"
         }
@@ -0,0 +1,153 @@
+import hashlib
+import threading
+from datetime import datetime
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+import app.extensions as extensions
+from app.config import Config
+from app.utils.lru_cache import LRUCache
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def cache_key(model: str, text: str) -> str:
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{model}:{digest}"
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed by (embed model, sha256 of normalized text).
+
+    Tier one is an in-process LRU, tier two is the Mongo embedding_cache
+    collection. Entries written for any other model are purged the first
+    time a model is used, so changing OLLAMA_EMBED_MODEL invalidates both
+    tiers.
+    """
+
+    def __init__(self):
+        self.memory = LRUCache(Config.EMBED_CACHE_SIZE)
+        self.persistent = Config.EMBED_CACHE_PERSISTENT
+        self.lock = threading.Lock()
+        self.checked_models = set()
+        self.persistent_hits = 0
+        self.persistent_misses = 0
+
+    def _collection(self):
+        if not self.persistent or extensions.db is None:
+            return None
+        return extensions.db.embedding_cache
+
+    def _purge_other_models(self, model: str, collection):
+        with self.lock:
+            if model in self.checked_models:
+                return
+            self.checked_models.add(model)
+
+        try:
+            removed = collection.delete_many({"model": {"$ne": model}}).deleted_count
+            if removed:
+                print(f"Embedding cache: dropped {removed} entries from other models")
+        except PyMongoError as e:
+            print("Embedding cache purge failed:", e)
+
+    def get_many(self, model: str, texts: list) -> list:
+        """
+        Returns one embedding per text, None where neither tier has it
+        """
+        keys = [cache_key(model, text) for text in texts]
+        results = [self.memory.get(key) for key in keys]
+
+        missing = {key for key, result in zip(keys, results) if result is None}
+        collection = self._collection()
+
+        if missing and collection is not None:
+            self._purge_other_models(model, collection)
+
+            try:
+                found = {
+                    row["_id"]: row["embedding"]
+                    for row in collection.find(
+                        {"_id": {"$in": list(missing)}},
+                        {"embedding": 1}
+                    )
+                }
+            except PyMongoError as e:
+                print("Embedding cache lookup failed:", e)
+                found = {}
+
+            for key, embedding in found.items():
+                self.memory.set(key, embedding)
+
+            with self.lock:
+                self.persistent_hits += len(found)
+                self.persistent_misses += len(missing) - len(found)
+
+            results = [
+                found.get(key) if result is None else result
+                for key, result in zip(keys, results)
+            ]
+
+        return results
+
+    def get(self, model: str, text: str):
+        return self.get_many(model, [text])[0]
+
+    def set_many(self, model: str, texts: list, embeddings: list):
+        rows = {}
+        for text, embedding in zip(texts, embeddings):
+            key = cache_key(model, text)
+            self.memory.set(key, embedding)
+            rows[key] = embedding
+
+        collection = self._collection()
+        if collection is None or not rows:
+            return
+
+        now = datetime.utcnow()
+        try:
+            collection.bulk_write([
+                UpdateOne(
+                    {"_id": key},
+                    {"$setOnInsert": {
+                        "model": model,
+                        "embedding": embedding,
+                        "createdAt": now
+                    }},
+                    upsert=True
+                )
+                for key, embedding in rows.items()
+            ], ordered=False)
+        except PyMongoError as e:
+            print("Embedding cache write failed:", e)
+
+    def set(self, model: str, text: str, embedding: list):
+        self.set_many(model, [text], [embedding])
+
+    def stats(self) -> dict:
+        memory = self.memory.stats()
+
+        with self.lock:
+            persistent_hits = self.persistent_hits
+            persistent_misses = self.persistent_misses
+
+        lookups = memory["hits"] + memory["misses"]
+        hits = memory["hits"] + persistent_hits
+
+        return {
+            "memory": memory,
+            "persistent": {
+                "enabled": self.persistent,
+                "hits": persistent_hits,
+                "misses": persistent_misses
+            },
+            "lookups": lookups,
+            "hitRate": round(hits / lookups, 4) if lookups else 0.0
+        }
+
+
+embedding_cache = EmbeddingCache()
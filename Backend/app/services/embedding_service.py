@@ -1,9 +1,9 @@
-import requests
+import asyncio
 import os
-from datetime import datetime
-from bson import ObjectId
-import app.extensions as extensions
-from app.config import Config
+from app.services.embedding_cache import embedding_cache
+from app.services.ollama_client import ollama_client, OllamaError
+from app.services.async_ollama_client import async_ollama_client
+from app.services.write_buffer import write_buffer
 
 
 class EmbeddingService:
@@ -16,56 +16,149 @@ class EmbeddingService:
 
    
     def embed_text(self, text: str, user_id=None):
+        cached = embedding_cache.get(self.embed_model, text)
+        if cached is not None:
+            return cached
+
         try:
-            response = requests.post(
-                 f"{Config.OLLAMA_BASE_URL}/api/embeddings",
-                json={
+            data = ollama_client.post(
+                "/api/embeddings",
+                {
                     "model": self.embed_model,
                     "prompt": text
                 },
                 timeout=30
             )
-            response.raise_for_status()
-        except requests.RequestException as e:
+        except OllamaError as e:
             raise RuntimeError(f"Ollama embedding error: {str(e)}")
 
-        data = response.json()
-
         if "embedding" not in data:
             raise RuntimeError(f"Invalid embedding response: {data}")
 
         embedding = data["embedding"]
+        embedding_cache.set(self.embed_model, text, embedding)
 
         token_count = len(text.split())
 
         if user_id:
-            extensions.db.usage_logs.insert_one({
-                "userId": ObjectId(user_id),
-                "type": "embedding",
-                "tokens": token_count,
-                "model": self.embed_model,
-                "createdAt": datetime.utcnow()
-            })
+            write_buffer.log_usage(user_id, "embedding", token_count, self.embed_model)
 
         return embedding
 
+    async def aembed_text(self, text: str, user_id=None):
+        """
+        embed_text() for asyncio callers, the cache's Mongo tier runs on a thread
+        """
+        cached = await asyncio.to_thread(embedding_cache.get, self.embed_model, text)
+        if cached is not None:
+            return cached
+
+        try:
+            data = await async_ollama_client.post(
+                "/api/embeddings",
+                {
+                    "model": self.embed_model,
+                    "prompt": text
+                },
+                timeout=30
+            )
+        except OllamaError as e:
+            raise RuntimeError(f"Ollama embedding error: {str(e)}")
+
+        if "embedding" not in data:
+            raise RuntimeError(f"Invalid embedding response: {data}")
+
+        embedding = data["embedding"]
+        await asyncio.to_thread(embedding_cache.set, self.embed_model, text, embedding)
+
+        if user_id:
+            write_buffer.log_usage(user_id, "embedding", len(text.split()), self.embed_model)
+
+        return embedding
+
+    def embed_texts(self, texts: list, user_id=None):
+        """
+        Embed many texts, only cache misses go to Ollama in a single /api/embed call
+        """
+        if not texts:
+            return []
+
+        embeddings = embedding_cache.get_many(self.embed_model, texts)
+
+        missing = list(dict.fromkeys(
+            text for text, embedding in zip(texts, embeddings) if embedding is None
+        ))
+        if not missing:
+            return embeddings
+
+        try:
+            data = ollama_client.post(
+                "/api/embed",
+                {
+                    "model": self.embed_model,
+                    "input": missing
+                },
+                timeout=30 + len(missing)
+            )
+        except OllamaError as e:
+            raise RuntimeError(f"Ollama embedding error: {str(e)}")
+
+        computed = data.get("embeddings")
+        if not computed or len(computed) != len(missing):
+            raise RuntimeError(f"Invalid batch embedding response: {data}")
+
+        embedding_cache.set_many(self.embed_model, missing, computed)
+        computed_by_text = dict(zip(missing, computed))
+
+        token_count = sum(len(text.split()) for text in missing)
+
+        if user_id:
+            write_buffer.log_usage(user_id, "embedding", token_count, self.embed_model)
+
+        return [
+            computed_by_text[text] if embedding is None else embedding
+            for text, embedding in zip(texts, embeddings)
+        ]
+
  
     def generate_answer(self, prompt: str, user_id=None):
         try:
-            response = requests.post(
-               f"{Config.OLLAMA_BASE_URL}/api/generate",
-                json={
+            data = ollama_client.post(
+                "/api/generate",
+                {
                     "model": self.chat_model,
                     "prompt": prompt,
                     "stream": False
                 },
                 timeout=60
             )
-            response.raise_for_status()
-        except requests.RequestException as e:
+        except OllamaError as e:
             raise RuntimeError(f"Ollama generation error: {str(e)}")
 
-        data = response.json()
+        answer = data.get("response")
+        if answer is None:
+            raise RuntimeError(f"Invalid generation response: {data}")
+
+        token_count = len(prompt.split()) + len(answer.split())
+
+        if user_id:
+            write_buffer.log_usage(user_id, "generation", token_count, self.chat_model)
+
+        return answer
+
+    async def agenerate_answer(self, prompt: str, user_id=None):
+        try:
+            data = await async_ollama_client.post(
+                "/api/generate",
+                {
+                    "model": self.chat_model,
+                    "prompt": prompt,
+                    "stream": False
+                },
+                timeout=60
+            )
+        except OllamaError as e:
+            raise RuntimeError(f"Ollama generation error: {str(e)}")
 
         answer = data.get("response")
         if answer is None:
@@ -74,12 +167,44 @@ class EmbeddingService:
         token_count = len(prompt.split()) + len(answer.split())
 
         if user_id:
-            extensions.db.usage_logs.insert_one({
-                "userId": ObjectId(user_id),
-                "type": "generation",
-                "tokens": token_count,
-                "model": self.chat_model,
-                "createdAt": datetime.utcnow()
-            })
+            write_buffer.log_usage(user_id, "generation", token_count, self.chat_model)
 
         return answer
+
+    def stream_answer(self, prompt: str, user_id=None):
+        """
+        Yield answer tokens as Ollama produces them. Usage is logged when the
+        stream ends, or is closed early, once it produced any token
+        """
+        stream = ollama_client.stream(
+            "/api/generate",
+            {
+                "model": self.chat_model,
+                "prompt": prompt
+            },
+            timeout=60
+        )
+
+        tokens = []
+
+        try:
+            for data in stream:
+                if "error" in data:
+                    raise RuntimeError(f"Ollama generation error: {data['error']}")
+
+                token = data.get("response")
+                if token:
+                    tokens.append(token)
+                    yield token
+
+                if data.get("done"):
+                    break
+        except OllamaError as e:
+            raise RuntimeError(f"Ollama generation error: {str(e)}")
+        finally:
+            stream.close()
+
+            token_count = len(prompt.split()) + len("".join(tokens).split())
+
+            if user_id and tokens:
+                write_buffer.log_usage(user_id, "generation", token_count, self.chat_model)
@@ -0,0 +1,384 @@
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+import app.extensions as extensions
+from app.config import Config
+
+
+class IngestionQueueFull(Exception):
+    pass
+
+
+class IngestionDeferred(Exception):
+    """
+    Raised by a job that did what it could for now, it is queued again to
+    run after delay seconds without using up an attempt
+    """
+
+    def __init__(self, message: str, delay: float):
+        super().__init__(message)
+        self.delay = delay
+
+
+class IngestionQueue:
+    """
+    Durable ingestion scheduler backed by the ingestion_jobs collection.
+
+    Jobs are claimed atomically with find_one_and_update, so several
+    processes can share the collection. Running jobs carry a heartbeat; a job
+    whose heartbeat is older than INGEST_JOB_LEASE_SECONDS belonged to a
+    process that died and is put back in the queue.
+    """
+
+    def __init__(self):
+        self.document_service = None
+        self.workers = []
+        self.active_jobs = set()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.started = False
+
+    @property
+    def jobs(self):
+        return extensions.db.ingestion_jobs
+
+    def start(self):
+        """
+        Recover and start the workers, once per process. Called before every
+        request, so it has to stay cheap once started
+        """
+        if self.started:
+            return
+
+        with self.lock:
+            if self.started or extensions.db is None:
+                return
+
+            from app.services.document_service import DocumentService
+
+            self.document_service = DocumentService()
+            self.started = True
+
+        for i in range(Config.INGEST_WORKERS):
+            worker = threading.Thread(
+                target=self._worker_loop,
+                name=f"ingestion-worker-{i}",
+                daemon=True
+            )
+            worker.start()
+            self.workers.append(worker)
+
+        threading.Thread(
+            target=self._maintenance_loop,
+            name="ingestion-maintenance",
+            daemon=True
+        ).start()
+
+        print(f"Ingestion queue started with {Config.INGEST_WORKERS} workers")
+
+    def enqueue(self, document_id: str, file_path: str, user_id: str, enforce_limit: bool = True):
+        """
+        Queue the document, or return the id of its queued or running job
+        if it already has one
+        """
+        if enforce_limit:
+            pending = self.jobs.count_documents(
+                {"status": {"$in": ["queued", "running"]}}
+            )
+            if pending >= Config.INGEST_MAX_PENDING:
+                raise IngestionQueueFull("Ingestion queue is full, try again later")
+
+        now = datetime.utcnow()
+        try:
+            job_id = self.jobs.insert_one({
+                "documentId": ObjectId(document_id),
+                "userId": ObjectId(user_id),
+                "filePath": file_path,
+                "status": "queued",
+                # Unset once the job finishes, a unique partial index keeps
+                # one active job per document
+                "active": True,
+                "attempts": 0,
+                "maxAttempts": Config.INGEST_MAX_ATTEMPTS,
+                "progress": {"done": 0, "total": 0},
+                "error": None,
+                "runAfter": now,
+                "createdAt": now,
+                "updatedAt": now
+            }).inserted_id
+        except DuplicateKeyError:
+            existing = self.jobs.find_one(
+                {"documentId": ObjectId(document_id), "active": True},
+                {"_id": 1}
+            )
+            if existing is None:
+                raise
+            return existing["_id"]
+
+        self.wakeup.set()
+        return job_id
+
+    def wake(self, document_id: str):
+        """
+        Run a deferred job of the document now instead of at its runAfter,
+        jobs backing off after an error keep their delay
+        """
+        woken = self.jobs.update_one(
+            {"documentId": ObjectId(document_id), "status": "queued", "error": None},
+            {"$set": {"runAfter": datetime.utcnow()}}
+        ).modified_count
+
+        if woken:
+            self.wakeup.set()
+
+    def get_job(self, document_id: str):
+        return self.jobs.find_one(
+            {"documentId": ObjectId(document_id)},
+            sort=[("createdAt", -1)]
+        )
+
+    def recover(self):
+        """
+        Requeue jobs from dead processes and create jobs for documents stuck
+        in "processing" without one
+        """
+        self._reclaim_stale_jobs()
+
+        active = set(self.jobs.distinct(
+            "documentId",
+            {"status": {"$in": ["queued", "running"]}}
+        ))
+
+        orphaned = 0
+        for document in extensions.db.documents.find(
+            {"status": "processing"},
+            {"_id": 1, "userId": 1, "path": 1}
+        ):
+            if document["_id"] in active or not document.get("path"):
+                continue
+
+            self.enqueue(
+                str(document["_id"]),
+                document["path"],
+                str(document["userId"]),
+                enforce_limit=False
+            )
+            orphaned += 1
+
+        if orphaned:
+            print(f"Requeued {orphaned} orphaned documents")
+
+    def _reclaim_stale_jobs(self):
+        now = datetime.utcnow()
+        stale = {
+            "status": "running",
+            "heartbeatAt": {"$lt": now - timedelta(seconds=Config.INGEST_JOB_LEASE_SECONDS)}
+        }
+
+        for job in self.jobs.find(
+            {**stale, "$expr": {"$gte": ["$attempts", "$maxAttempts"]}},
+            {"_id": 1, "documentId": 1, "userId": 1}
+        ):
+            self._mark_failed(job, "Worker stopped while processing")
+
+        reclaimed = self.jobs.update_many(
+            stale,
+            {"$set": {"status": "queued", "runAfter": now, "updatedAt": now}}
+        ).modified_count
+
+        if reclaimed:
+            print(f"Reclaimed {reclaimed} stale ingestion jobs")
+            self.wakeup.set()
+
+    def _claim_next(self):
+        now = datetime.utcnow()
+        return self.jobs.find_one_and_update(
+            {"status": "queued", "runAfter": {"$lte": now}},
+            {
+                "$set": {
+                    "status": "running",
+                    "heartbeatAt": now,
+                    "startedAt": now,
+                    "updatedAt": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("runAfter", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _worker_loop(self):
+        while True:
+            try:
+                job = self._claim_next()
+            except Exception as e:
+                print("Ingestion queue claim failed:", e)
+                job = None
+
+            if job is None:
+                self.wakeup.wait(Config.INGEST_POLL_SECONDS)
+                self.wakeup.clear()
+                continue
+
+            self._run(job)
+
+    def _maintenance_loop(self):
+        interval = max(1, Config.INGEST_JOB_LEASE_SECONDS // 3)
+
+        # Off the request that started the queue
+        try:
+            self.recover()
+        except Exception as e:
+            print("Ingestion queue recovery failed:", e)
+
+        while True:
+            time.sleep(interval)
+
+            try:
+                with self.lock:
+                    active = list(self.active_jobs)
+
+                if active:
+                    self.jobs.update_many(
+                        {"_id": {"$in": active}, "status": "running"},
+                        {"$set": {"heartbeatAt": datetime.utcnow()}}
+                    )
+
+                self._reclaim_stale_jobs()
+            except Exception as e:
+                print("Ingestion queue maintenance failed:", e)
+
+    def _run(self, job):
+        job_id = job["_id"]
+        document_id = str(job["documentId"])
+
+        with self.lock:
+            self.active_jobs.add(job_id)
+
+        def report_progress(done, total):
+            now = datetime.utcnow()
+            self.jobs.update_one(
+                {"_id": job_id},
+                {"$set": {
+                    "progress": {"done": done, "total": total},
+                    "heartbeatAt": now,
+                    "updatedAt": now
+                }}
+            )
+
+        try:
+            self.document_service.ingest_document(
+                document_id=document_id,
+                file_path=job["filePath"],
+                user_id=str(job["userId"]),
+                progress_callback=report_progress
+            )
+
+            self._update_running(
+                job,
+                {
+                    "$set": {
+                        "status": "completed",
+                        "error": None,
+                        "finishedAt": datetime.utcnow(),
+                        "updatedAt": datetime.utcnow()
+                    },
+                    "$unset": {"active": ""}
+                }
+            )
+
+        except IngestionDeferred as e:
+            now = datetime.utcnow()
+            self._update_running(
+                job,
+                {
+                    "$set": {
+                        "status": "queued",
+                        "error": None,
+                        "runAfter": now + timedelta(seconds=e.delay),
+                        "updatedAt": now
+                    },
+                    "$inc": {"attempts": -1}
+                }
+            )
+
+        except Exception as e:
+            print(f"Ingestion failed for document {document_id}:", e)
+            traceback.print_exc()
+
+            if job["attempts"] >= job["maxAttempts"]:
+                self._mark_failed(job, str(e))
+            else:
+                delay = Config.INGEST_RETRY_BACKOFF_SECONDS * 2 ** (job["attempts"] - 1)
+                now = datetime.utcnow()
+                self._update_running(
+                    job,
+                    {"$set": {
+                        "status": "queued",
+                        "error": str(e),
+                        "runAfter": now + timedelta(seconds=delay),
+                        "updatedAt": now
+                    }}
+                )
+                print(f"Retrying document {document_id} in {delay}s")
+
+        finally:
+            with self.lock:
+                self.active_jobs.discard(job_id)
+
+    def cancel(self, document_id: str):
+        """
+        Stop the queued or running job of the document. A running one finds
+        out when its current step ends and clears what it wrote
+        """
+        now = datetime.utcnow()
+        self.jobs.update_many(
+            {"documentId": ObjectId(document_id), "status": {"$in": ["queued", "running"]}},
+            {
+                "$set": {"status": "cancelled", "finishedAt": now, "updatedAt": now},
+                "$unset": {"active": ""}
+            }
+        )
+
+    def _update_running(self, job, update: dict) -> bool:
+        """
+        Apply update if the job is still running, False when it was cancelled
+        or reclaimed in the meantime
+        """
+        if self.jobs.update_one({"_id": job["_id"], "status": "running"}, update).matched_count:
+            return True
+
+        if self.jobs.find_one({"_id": job["_id"], "status": "cancelled"}, {"_id": 1}):
+            self.document_service.clear_document(str(job["documentId"]), str(job["userId"]))
+        return False
+
+    def _mark_failed(self, job, error: str):
+        now = datetime.utcnow()
+
+        if not self._update_running(
+            job,
+            {
+                "$set": {
+                    "status": "failed",
+                    "error": error,
+                    "finishedAt": now,
+                    "updatedAt": now
+                },
+                "$unset": {"active": ""}
+            }
+        ):
+            return
+
+        extensions.db.documents.update_one(
+            {"_id": job["documentId"]},
+            {"$set": {"status": "failed", "error": error}}
+        )
+
+
+ingestion_queue = IngestionQueue()
@@ -0,0 +1,185 @@
+import json
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.config import Config
+
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class OllamaError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls for
+    reset_seconds, then lets a single trial call through (half-open)
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self.lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_seconds:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.opened_at is None:
+                return True
+
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                return False
+
+            if self.trial_in_flight:
+                return False
+
+            self.trial_in_flight = True
+            return True
+
+    def cancel_trial(self):
+        with self.lock:
+            self.trial_in_flight = False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class OllamaClient:
+    """
+    Shared Ollama HTTP client: pooled keep-alive connections, a cap on
+    in-flight requests, retries with backoff on transient errors and a
+    circuit breaker so a dead Ollama fails fast instead of piling up timeouts
+    """
+
+    def __init__(self, base_url: str = None):
+        self.base_url = (base_url or Config.OLLAMA_BASE_URL).rstrip("/")
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=Config.OLLAMA_MAX_CONCURRENCY
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.semaphore = threading.BoundedSemaphore(Config.OLLAMA_MAX_CONCURRENCY)
+        self.breaker = CircuitBreaker(
+            Config.OLLAMA_BREAKER_THRESHOLD,
+            Config.OLLAMA_BREAKER_RESET_SECONDS
+        )
+
+    def _acquire(self):
+        if not self.breaker.allow():
+            raise OllamaError("Ollama circuit breaker is open, service unavailable")
+
+        if not self.semaphore.acquire(timeout=Config.OLLAMA_QUEUE_TIMEOUT):
+            self.breaker.cancel_trial()
+            raise OllamaError("Too many concurrent Ollama requests")
+
+    def _send(self, path: str, payload: dict, timeout, stream: bool = False):
+        """
+        POST with retries, returns an open response with a 2xx status
+        """
+        url = f"{self.base_url}{path}"
+        attempt = 0
+
+        while True:
+            try:
+                response = self.session.post(
+                    url,
+                    json=payload,
+                    timeout=timeout,
+                    stream=stream
+                )
+
+                if response.status_code not in RETRYABLE_STATUS:
+                    response.raise_for_status()
+                    return response
+
+                response.close()
+                error = OllamaError(f"Ollama returned HTTP {response.status_code}")
+
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = OllamaError(str(e))
+            except requests.RequestException as e:
+                raise OllamaError(str(e))
+
+            if attempt >= Config.OLLAMA_MAX_RETRIES:
+                raise error
+
+            time.sleep(Config.OLLAMA_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+            attempt += 1
+
+    def post(self, path: str, payload: dict, timeout) -> dict:
+        self._acquire()
+        try:
+            response = self._send(path, payload, timeout)
+            data = response.json()
+        except ValueError:
+            self.breaker.record_failure()
+            raise OllamaError(f"Invalid JSON from Ollama {path}")
+        except OllamaError:
+            self.breaker.record_failure()
+            raise
+        finally:
+            self.semaphore.release()
+
+        self.breaker.record_success()
+        return data
+
+    def stream(self, path: str, payload: dict, timeout):
+        """
+        Yield the decoded NDJSON objects of a streamed response. The
+        concurrency slot is held until the stream is consumed or closed.
+        """
+        self._acquire()
+        try:
+            try:
+                response = self._send(path, {**payload, "stream": True}, timeout, stream=True)
+            except OllamaError:
+                self.breaker.record_failure()
+                raise
+
+            self.breaker.record_success()
+
+            try:
+                for line in response.iter_lines():
+                    if line:
+                        yield json.loads(line)
+            except requests.RequestException as e:
+                self.breaker.record_failure()
+                raise OllamaError(str(e))
+            finally:
+                response.close()
+        finally:
+            self.semaphore.release()
+
+
+ollama_client = OllamaClient()
@@ -0,0 +1,95 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+import threading
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from app.config import Config
+from app.utils.worker_pool import spawn_pool
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def _hash(password: str, method: str) -> str:
+    return generate_password_hash(password, method=method)
+
+
+def normalize_method(method: str) -> str:
+    """
+    The method as werkzeug writes it into hashes, short forms such as
+    "scrypt" or "pbkdf2" are expanded with their default parameters
+    """
+    return generate_password_hash("", method=method).split("$", 1)[0]
+
+
+def _verify(stored_hash: str, password: str, method: str) -> Tuple[bool, Optional[str]]:
+    """
+    Check password, and when it matches a hash made with other parameters
+    than method (in normalize_method form), return a fresh hash to store in
+    its place.
+    """
+    if not check_password_hash(stored_hash, password):
+        return False, None
+
+    if stored_hash.split("$", 1)[0] != method:
+        return True, generate_password_hash(password, method=method)
+
+    return True, None
+
+
+class PasswordHasher:
+    """
+    Runs password hashing and verification on a dedicated process pool so the
+    CPU-bound key derivation never holds the GIL of a request worker.
+
+    At most PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_PENDING calls are in
+    the pool at once; a caller that cannot get a slot within
+    PASSWORD_HASH_QUEUE_TIMEOUT gets PasswordHasherBusy.
+    """
+
+    def __init__(self):
+        self.pool = None
+        self.method = None
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(
+            Config.PASSWORD_HASH_WORKERS + Config.PASSWORD_HASH_MAX_PENDING
+        )
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self.pool is None:
+                # Workers re-import the entry module, run.py and create_app
+                # skip the app and its background services in them
+                self.pool = spawn_pool(Config.PASSWORD_HASH_WORKERS)
+            return self.pool
+
+    def _get_method(self) -> str:
+        # Costs one hash, run on the pool like the others; racing callers
+        # compute the same value
+        if self.method is None:
+            self.method = self._run(normalize_method, Config.PASSWORD_HASH_METHOD)
+        return self.method
+
+    def _run(self, fn, *args):
+        if not self.slots.acquire(timeout=Config.PASSWORD_HASH_QUEUE_TIMEOUT):
+            raise PasswordHasherBusy("Authentication is busy, please retry shortly")
+
+        try:
+            return self._get_pool().submit(fn, *args).result()
+        finally:
+            self.slots.release()
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash, password, self._get_method())
+
+    def verify(self, stored_hash: str, password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Returns (matches, new_hash), new_hash is set when the stored hash
+        should be replaced because PASSWORD_HASH_METHOD changed.
+        """
+        return self._run(_verify, stored_hash, password, self._get_method())
+
+
+password_hasher = PasswordHasher()
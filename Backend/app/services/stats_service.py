@@ -0,0 +1,164 @@
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+import app.extensions as extensions
+from app.services.usage_rollup_service import usage_rollup_service
+
+
+GLOBAL_ID = "global"
+COUNTERS = ["totalUsers", "totalDocuments", "activeDocuments", "totalQueries", "totalTokens"]
+USER_COUNTERS = ["documentCount", "queryCount", "tokenCount"]
+
+
+def daily_id(day: datetime) -> str:
+    return f"daily:{day.strftime('%Y-%m-%d')}"
+
+
+class StatsService:
+    """
+    Dashboard counters kept in the stats collection and updated with atomic
+    $inc on every write, so /admin/stats is a single indexed read. reconcile()
+    rebuilds them from the raw collections.
+    """
+
+    @property
+    def collection(self):
+        return extensions.db.stats
+
+    def increment(self, **counters):
+        counters = {name: value for name, value in counters.items() if value}
+        if not counters:
+            return
+
+        self.collection.update_one(
+            {"_id": GLOBAL_ID},
+            {"$inc": counters},
+            upsert=True
+        )
+
+    def increment_users(self, per_user: dict):
+        """
+        Bump per-user counters, per_user maps a user id to {counter: delta}
+        """
+        operations = []
+        for user_id, counters in per_user.items():
+            counters = {name: value for name, value in counters.items() if value}
+            if counters:
+                operations.append(UpdateOne({"_id": ObjectId(user_id)}, {"$inc": counters}))
+
+        if operations:
+            extensions.db.users.bulk_write(operations, ordered=False)
+
+    def record_queries(self, created_at: list):
+        """
+        Count chat messages given their createdAt values, per day and in total
+        """
+        if not created_at:
+            return
+
+        self.increment(totalQueries=len(created_at))
+
+        per_day = {}
+        for when in created_at:
+            key = daily_id(when)
+            per_day[key] = per_day.get(key, 0) + 1
+
+        for key, count in per_day.items():
+            self.collection.update_one(
+                {"_id": key},
+                {"$inc": {"queries": count}},
+                upsert=True
+            )
+
+    def get_dashboard(self) -> dict:
+        today = daily_id(datetime.utcnow())
+        rows = {
+            row["_id"]: row
+            for row in self.collection.find({"_id": {"$in": [GLOBAL_ID, today]}})
+        }
+
+        # The first $inc after an upgrade creates the row with only the
+        # counter it touched, only a reconciled row holds real totals
+        if "reconciledAt" not in rows.get(GLOBAL_ID, {}):
+            return self.reconcile()
+
+        totals = rows[GLOBAL_ID]
+        return {
+            **{name: totals.get(name, 0) for name in COUNTERS},
+            "queriesToday": rows.get(today, {}).get("queries", 0)
+        }
+
+    def reconcile(self) -> dict:
+        """
+        Recompute every counter, including the per-user ones and the usage
+        rollups, from users, documents, chat_messages and usage_logs
+        """
+        db = extensions.db
+
+        total_tokens_result = list(db.usage_logs.aggregate([
+            {"$group": {"_id": None, "total": {"$sum": "$tokens"}}}
+        ]))
+
+        totals = {
+            "totalUsers": db.users.count_documents({}),
+            "totalDocuments": db.documents.count_documents({}),
+            "activeDocuments": db.documents.count_documents({"enabled": True}),
+            "totalQueries": db.chat_messages.count_documents({}),
+            "totalTokens": total_tokens_result[0]["total"] if total_tokens_result else 0
+        }
+
+        self.collection.replace_one(
+            {"_id": GLOBAL_ID},
+            {**totals, "reconciledAt": datetime.utcnow()},
+            upsert=True
+        )
+
+        self.collection.delete_many({"_id": {"$regex": "^daily:"}})
+        for row in db.chat_messages.aggregate([
+            {"$group": {
+                "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$createdAt"}},
+                "queries": {"$sum": 1}
+            }}
+        ]):
+            if row["_id"]:
+                self.collection.update_one(
+                    {"_id": f"daily:{row['_id']}"},
+                    {"$set": {"queries": row["queries"]}},
+                    upsert=True
+                )
+
+        self._reconcile_users(db)
+        usage_rollup_service.rebuild()
+
+        today = self.collection.find_one({"_id": daily_id(datetime.utcnow())}) or {}
+
+        print("Dashboard stats reconciled")
+        return {**totals, "queriesToday": today.get("queries", 0)}
+
+    def _reconcile_users(self, db):
+        per_user = {}
+
+        for collection, counter, value in [
+            (db.documents, "documentCount", 1),
+            (db.chat_messages, "queryCount", 1),
+            (db.usage_logs, "tokenCount", "$tokens"),
+        ]:
+            for row in collection.aggregate([
+                {"$group": {"_id": "$userId", "total": {"$sum": value}}}
+            ]):
+                if row["_id"] is not None:
+                    per_user.setdefault(row["_id"], {})[counter] = row["total"]
+
+        db.users.update_many({}, {"$set": {name: 0 for name in USER_COUNTERS}})
+
+        operations = [
+            UpdateOne({"_id": user_id}, {"$set": counters})
+            for user_id, counters in per_user.items()
+        ]
+        if operations:
+            db.users.bulk_write(operations, ordered=False)
+
+
+stats_service = StatsService()
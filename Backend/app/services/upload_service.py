@@ -0,0 +1,483 @@
+import codecs
+import hashlib
+import mmap
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from werkzeug.utils import secure_filename
+
+import app.extensions as extensions
+from app.config import Config
+from app.services.ingestion_queue import ingestion_queue
+from app.services.stats_service import stats_service
+
+
+UPLOAD_FOLDER = "uploads/documents"
+ALLOWED_TYPES = {
+    "pdf": "application/pdf",
+    "txt": "text/plain"
+}
+
+
+class UploadError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def create_document(user_id: str, filename: str, original_filename: str, file_path: str, **fields):
+    """
+    Insert a processing document, returns its id
+    """
+    document = {
+        "userId": ObjectId(user_id),
+        "filename": filename,
+        "originalFilename": original_filename,
+        "path": file_path,
+        "status": "processing",
+        "enabled": True,
+        "createdAt": datetime.utcnow(),
+        **fields
+    }
+    return extensions.db.documents.insert_one(document).inserted_id
+
+
+def enqueue_document(doc_id, file_path: str, user_id: str):
+    """
+    Queue ingestion of a new document and count it, the document is removed
+    again when the queue is full (IngestionQueueFull is re-raised)
+    """
+    try:
+        ingestion_queue.enqueue(
+            document_id=str(doc_id),
+            file_path=file_path,
+            user_id=user_id
+        )
+    except Exception:
+        extensions.db.documents.delete_one({"_id": doc_id})
+        raise
+
+    stats_service.increment(totalDocuments=1, activeDocuments=1)
+    stats_service.increment_users({user_id: {"documentCount": 1}})
+
+
+class _SessionHash:
+    """
+    Incremental sha256 over the contiguous prefix of one upload, advanced
+    under its own lock so one session's reads never block another's
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.digest = hashlib.sha256()
+        self.hashed = 0
+        self.used = time.monotonic()
+
+
+class UploadService:
+    """
+    Resumable uploads: a session is initiated with the file's name, size and
+    type, parts of UPLOAD_PART_SIZE bytes are PUT in any order and written
+    straight to their offset in the target file, then the session is
+    completed into a document.
+
+    Limits are enforced while the bytes stream in: declared size, per-part
+    length and the file signature of the first part. The sha256 is advanced
+    over the contiguous prefix after every part, so completing only hashes
+    what is left. TXT uploads get their document and ingestion job at
+    initiate; ingestion runs in steps over the paragraphs that have arrived
+    and is deferred in between, it never holds a worker waiting for parts.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hashers = {}
+
+    @property
+    def sessions(self):
+        return extensions.db.upload_sessions
+
+    def initiate(self, user_id: str, filename: str, size, mimetype: str) -> dict:
+        original_filename = secure_filename(filename or "")
+        extension = original_filename.rsplit(".", 1)[-1].lower() if "." in original_filename else None
+
+        if not original_filename:
+            raise UploadError("Empty filename")
+
+        if extension not in ALLOWED_TYPES:
+            raise UploadError("Only PDF and TXT allowed")
+
+        if mimetype != ALLOWED_TYPES[extension]:
+            raise UploadError("Invalid file type")
+
+        if not isinstance(size, int) or size <= 0:
+            raise UploadError("Uploaded file is empty")
+
+        if size > Config.UPLOAD_MAX_BYTES:
+            raise UploadError(
+                f"File size exceeds {Config.UPLOAD_MAX_BYTES // (1024 * 1024)}MB limit", 413
+            )
+
+        self._cleanup_expired()
+
+        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+        unique_filename = f"{uuid.uuid4()}_{original_filename}"
+        file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
+
+        # Sparse file of the final size, parts are written at their offsets
+        with open(file_path, "wb") as f:
+            f.truncate(size)
+
+        part_size = Config.UPLOAD_PART_SIZE
+        now = datetime.utcnow()
+        session = {
+            "userId": ObjectId(user_id),
+            "filename": unique_filename,
+            "originalFilename": original_filename,
+            "extension": extension,
+            "path": file_path,
+            "size": size,
+            "partSize": part_size,
+            "totalParts": -(-size // part_size),
+            "receivedParts": [],
+            "contiguousBytes": 0,
+            "status": "uploading",
+            "documentId": None,
+            "createdAt": now,
+            "expiresAt": now + timedelta(hours=Config.UPLOAD_SESSION_TTL_HOURS)
+        }
+        session["_id"] = self.sessions.insert_one(session).inserted_id
+
+        if extension == "txt" and Config.UPLOAD_EARLY_INGEST:
+            doc_id = create_document(
+                user_id, unique_filename, original_filename, file_path,
+                uploadId=session["_id"],
+                ingestedBytes=0
+            )
+            try:
+                enqueue_document(doc_id, file_path, user_id)
+            except Exception:
+                self._discard(session)
+                raise
+
+            self.sessions.update_one({"_id": session["_id"]}, {"$set": {"documentId": doc_id}})
+            session["documentId"] = doc_id
+
+        return session
+
+    def get(self, upload_id: str, user_id: str) -> dict:
+        if not ObjectId.is_valid(upload_id):
+            raise UploadError("Invalid uploadId")
+
+        session = self.sessions.find_one({"_id": ObjectId(upload_id), "userId": ObjectId(user_id)})
+        if not session:
+            raise UploadError("Upload not found", 404)
+
+        return session
+
+    def _part_length(self, session: dict, index: int) -> int:
+        start = index * session["partSize"]
+        return min(session["partSize"], session["size"] - start)
+
+    def write_part(self, upload_id: str, user_id: str, index: int, stream, content_length) -> dict:
+        session = self.get(upload_id, user_id)
+
+        if session["status"] != "uploading":
+            raise UploadError(f"Upload is {session['status']}", 409)
+
+        if index < 0 or index >= session["totalParts"]:
+            raise UploadError("Invalid part number")
+
+        expected = self._part_length(session, index)
+        if content_length is not None and content_length != expected:
+            raise UploadError(f"Part {index} must be {expected} bytes", 413 if content_length > expected else 400)
+
+        offset = index * session["partSize"]
+
+        # A received part may already be hashed and ingested, a retry is only
+        # accepted with the same bytes and leaves the file untouched
+        if index in session["receivedParts"]:
+            with open(session["path"], "rb") as f:
+                f.seek(offset)
+                for block in self._read_part(stream, index, expected):
+                    if f.read(len(block)) != block:
+                        raise UploadError(f"Part {index} was already received with different content", 409)
+            return session
+
+        check_signature = index == 0
+
+        with open(session["path"], "r+b") as f:
+            f.seek(offset)
+            for block in self._read_part(stream, index, expected):
+                if check_signature:
+                    self._check_signature(session, block)
+                    check_signature = False
+
+                f.write(block)
+
+        session = self.sessions.find_one_and_update(
+            {"_id": session["_id"]},
+            {"$addToSet": {"receivedParts": index}},
+            return_document=ReturnDocument.AFTER
+        )
+
+        contiguous = self._contiguous_bytes(session)
+        if contiguous > session["contiguousBytes"]:
+            self.sessions.update_one(
+                {"_id": session["_id"]},
+                {"$max": {"contiguousBytes": contiguous}}
+            )
+            session["contiguousBytes"] = contiguous
+
+            if session["documentId"]:
+                ingestion_queue.wake(str(session["documentId"]))
+
+        self._advance_hash(session, contiguous)
+
+        return session
+
+    def _read_part(self, stream, index: int, expected: int):
+        """
+        Yield the blocks of a part body, raising unless it is exactly expected bytes
+        """
+        received = 0
+        while True:
+            block = stream.read(min(Config.UPLOAD_READ_BLOCK, expected - received + 1))
+            if not block:
+                break
+
+            received += len(block)
+            if received > expected:
+                raise UploadError(f"Part {index} must be {expected} bytes", 413)
+
+            yield block
+
+        if received != expected:
+            raise UploadError(f"Part {index} must be {expected} bytes")
+
+    def _check_signature(self, session: dict, first_block: bytes):
+        if session["extension"] == "pdf":
+            if not first_block.startswith(b"%PDF-"):
+                raise UploadError("File is not a PDF")
+        else:
+            try:
+                codecs.getincrementaldecoder("utf-8")().decode(first_block, final=False)
+            except UnicodeDecodeError:
+                raise UploadError("TXT files must be UTF-8 text")
+
+            if b"\x00" in first_block:
+                raise UploadError("TXT files must be UTF-8 text")
+
+    def _contiguous_bytes(self, session: dict) -> int:
+        received = set(session["receivedParts"])
+        parts = 0
+        while parts in received:
+            parts += 1
+        return min(parts * session["partSize"], session["size"])
+
+    def _advance_hash(self, session: dict, contiguous: int):
+        """
+        Feed the bytes between the last hashed offset and contiguous into the
+        session's sha256, parts are read back while still in the page cache
+        """
+        key = str(session["_id"])
+
+        with self.lock:
+            self._evict_idle_hashers()
+
+            state = self.hashers.get(key)
+            if state is None:
+                state = self.hashers[key] = _SessionHash()
+            state.used = time.monotonic()
+
+        # The file is read under the session's lock only
+        with state.lock:
+            if contiguous > state.hashed:
+                with open(session["path"], "rb") as f:
+                    f.seek(state.hashed)
+                    remaining = contiguous - state.hashed
+                    while remaining:
+                        block = f.read(min(Config.UPLOAD_READ_BLOCK, remaining))
+                        if not block:
+                            break
+                        state.digest.update(block)
+                        remaining -= len(block)
+
+                state.hashed = contiguous - remaining
+
+            return state.digest
+
+    def _evict_idle_hashers(self):
+        """
+        Hashers live in the process that received the parts, while complete
+        or abort may run in another one. A hasher idle for longer than a
+        session can live is dropped; one evicted too early is rebuilt from
+        the file on the next part.
+        """
+        cutoff = time.monotonic() - Config.UPLOAD_SESSION_TTL_HOURS * 3600
+        for key in [key for key, state in self.hashers.items() if state.used < cutoff]:
+            del self.hashers[key]
+
+    def complete(self, upload_id: str, user_id: str) -> dict:
+        session = self.get(upload_id, user_id)
+
+        if session["status"] != "uploading":
+            raise UploadError(f"Upload is {session['status']}", 409)
+
+        missing = sorted(set(range(session["totalParts"])) - set(session["receivedParts"]))
+        if missing:
+            raise UploadError(f"Missing parts: {missing[:20]}", 409)
+
+        content_hash = self._advance_hash(session, session["size"]).hexdigest()
+        with self.lock:
+            self.hashers.pop(str(session["_id"]), None)
+
+        doc_id = session["documentId"]
+
+        if doc_id is None:
+            doc_id = create_document(
+                user_id, session["filename"], session["originalFilename"], session["path"],
+                contentHash=content_hash
+            )
+            try:
+                enqueue_document(doc_id, session["path"], user_id)
+            except Exception:
+                self._discard(session)
+                raise
+        else:
+            extensions.db.documents.update_one(
+                {"_id": doc_id},
+                {"$set": {"contentHash": content_hash}}
+            )
+            self._resume_ingestion(doc_id, session["path"], user_id)
+
+        self.sessions.update_one(
+            {"_id": session["_id"]},
+            {"$set": {
+                "status": "completed",
+                "documentId": doc_id,
+                "contentHash": content_hash,
+                "completedAt": datetime.utcnow()
+            }}
+        )
+
+        return {"documentId": str(doc_id), "contentHash": content_hash}
+
+    def abort(self, upload_id: str, user_id: str):
+        session = self.get(upload_id, user_id)
+
+        if session["status"] == "completed":
+            raise UploadError("Upload is already completed", 409)
+
+        self._discard(session)
+
+    def _discard(self, session: dict):
+        """
+        Remove an unfinished upload: its file, its early document if any with
+        its job and whatever was ingested so far, and the session
+        """
+        with self.lock:
+            self.hashers.pop(str(session["_id"]), None)
+
+        self.sessions.update_one({"_id": session["_id"]}, {"$set": {"status": "aborted"}})
+
+        if session.get("documentId"):
+            # Imported here, document_service imports this module
+            from app.services.document_service import DocumentService
+
+            ingestion_queue.cancel(str(session["documentId"]))
+            DocumentService().clear_document(str(session["documentId"]), str(session["userId"]))
+
+            extensions.db.documents.update_one(
+                {"_id": session["documentId"]},
+                {"$set": {"status": "failed", "error": "Upload aborted", "enabled": False}}
+            )
+            stats_service.increment(activeDocuments=-1)
+
+        if os.path.exists(session["path"]):
+            os.remove(session["path"])
+
+        self.sessions.delete_one({"_id": session["_id"]})
+
+    def _cleanup_expired(self):
+        for session in self.sessions.find({
+            "status": "uploading",
+            "expiresAt": {"$lt": datetime.utcnow()}
+        }).limit(100):
+            print(f"Discarding expired upload {session['_id']}")
+            self._discard(session)
+
+    def _resume_ingestion(self, doc_id, file_path: str, user_id: str):
+        """
+        Finish the early ingestion of a completed upload: a deferred job runs
+        now, a job that gave up while the upload was paused is queued again
+        and continues from the bytes already ingested
+        """
+        job = ingestion_queue.get_job(str(doc_id))
+
+        if job and job["status"] in ("queued", "running", "completed"):
+            ingestion_queue.wake(str(doc_id))
+            return
+
+        extensions.db.documents.update_one(
+            {"_id": doc_id},
+            {"$set": {"status": "processing", "error": None}}
+        )
+        ingestion_queue.enqueue(str(doc_id), file_path, user_id, enforce_limit=False)
+
+    def ingestable_range(self, upload_id, start: int):
+        """
+        Returns (end, final) for early ingestion from byte start: the bytes up
+        to end have arrived and end on a paragraph (else a line) break, or
+        end is the file size and final is True once every part is in. Raises
+        ValueError when the upload was aborted or expired.
+        """
+        session = self.sessions.find_one(
+            {"_id": ObjectId(upload_id)},
+            {"path": 1, "size": 1, "contiguousBytes": 1, "status": 1, "expiresAt": 1}
+        )
+        if not session or session["status"] == "aborted":
+            raise ValueError("Upload aborted")
+
+        if session["status"] == "uploading" and session["expiresAt"] < datetime.utcnow():
+            raise ValueError("Upload expired")
+
+        available = session["contiguousBytes"]
+        if available >= session["size"]:
+            return session["size"], True
+
+        if available <= start:
+            return start, False
+
+        with open(session["path"], "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            boundary = data.rfind(b"\n\n", start, available)
+            end = boundary + 2 if boundary >= 0 else data.rfind(b"\n", start, available) + 1
+
+        return max(end, start), False
+
+    def iter_range(self, file_path: str, start: int, end: int):
+        """
+        Yield (1, text) blocks of the bytes from start to end of a TXT upload
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        position = start
+
+        with open(file_path, "rb") as f:
+            f.seek(start)
+            while position < end:
+                block = f.read(min(Config.TXT_READ_BLOCK, end - position))
+                if not block:
+                    break
+                position += len(block)
+
+                text = decoder.decode(block, final=position >= end)
+                if text:
+                    yield 1, text
+
+
+upload_service = UploadService()
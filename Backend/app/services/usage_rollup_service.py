@@ -0,0 +1,164 @@
+from datetime import datetime
+from typing import List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+import app.extensions as extensions
+
+
+GRANULARITIES = ["hour", "day"]
+GROUP_FIELDS = {
+    "user": "userId",
+    "model": "model",
+    "type": "type",
+    "time": "bucket"
+}
+
+
+def bucket_start(when: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return when.replace(minute=0, second=0, microsecond=0)
+    return when.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class UsageRollupService:
+    """
+    Hourly and daily token totals per (user, model, type) in usage_rollups.
+
+    The write-behind buffer adds each flushed batch with bulk $inc upserts,
+    so /admin/usage groups a few rollup rows instead of joining every
+    usage_logs row to users. rebuild() recomputes everything from usage_logs.
+    """
+
+    @property
+    def collection(self):
+        return extensions.db.usage_rollups
+
+    def record(self, usage: dict):
+        """
+        Add write buffer usage entries, keyed (user_id, model, type, minute)
+        with {tokens, count} values
+        """
+        totals = {}
+
+        for (user_id, model, usage_type, minute), entry in usage.items():
+            for granularity in GRANULARITIES:
+                key = (granularity, bucket_start(minute, granularity), user_id, model, usage_type)
+                current = totals.setdefault(key, {"tokens": 0, "count": 0})
+                current["tokens"] += entry["tokens"]
+                current["count"] += entry["count"]
+
+        operations = [
+            UpdateOne(
+                {
+                    "granularity": granularity,
+                    "bucket": bucket,
+                    "userId": ObjectId(user_id),
+                    "model": model,
+                    "type": usage_type
+                },
+                {"$inc": current},
+                upsert=True
+            )
+            for (granularity, bucket, user_id, model, usage_type), current in totals.items()
+        ]
+
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+
+    def query(
+        self,
+        granularity: str = "day",
+        group_by: Optional[List[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> List[dict]:
+        """
+        Sum tokens and counts of the buckets in [start, end) by the group_by
+        fields (user, model, type, time). User rows carry the user's email.
+        """
+        group_by = group_by or ["user"]
+
+        match = {"granularity": granularity}
+        if start or end:
+            match["bucket"] = {}
+            if start:
+                match["bucket"]["$gte"] = bucket_start(start, granularity)
+            if end:
+                match["bucket"]["$lt"] = end
+
+        rows = list(self.collection.aggregate([
+            {"$match": match},
+            {"$group": {
+                "_id": {name: f"${GROUP_FIELDS[name]}" for name in group_by},
+                "tokens": {"$sum": "$tokens"},
+                "count": {"$sum": "$count"}
+            }},
+            {"$sort": {"_id.time": 1, "tokens": -1} if "time" in group_by else {"tokens": -1}}
+        ]))
+
+        emails = {}
+        if "user" in group_by:
+            user_ids = list({row["_id"]["user"] for row in rows})
+            emails = {
+                user["_id"]: user.get("email")
+                for user in extensions.db.users.find({"_id": {"$in": user_ids}}, {"email": 1})
+            }
+
+        results = []
+        for row in rows:
+            key = row["_id"]
+            result = {
+                GROUP_FIELDS[name]: key[name] for name in group_by
+            }
+
+            if "user" in group_by:
+                result["email"] = emails.get(key["user"])
+
+            result["tokens"] = row["tokens"]
+            result["count"] = row["count"]
+            results.append(result)
+
+        return results
+
+    def rebuild(self):
+        """
+        Recompute every bucket from usage_logs
+        """
+        self.collection.delete_many({})
+
+        for granularity in GRANULARITIES:
+            extensions.db.usage_logs.aggregate([
+                {"$group": {
+                    "_id": {
+                        "bucket": {"$dateTrunc": {"date": "$createdAt", "unit": granularity}},
+                        "userId": "$userId",
+                        "model": "$model",
+                        "type": "$type"
+                    },
+                    "tokens": {"$sum": "$tokens"},
+                    "count": {"$sum": {"$ifNull": ["$count", 1]}}
+                }},
+                {"$project": {
+                    "_id": 0,
+                    "granularity": {"$literal": granularity},
+                    "bucket": "$_id.bucket",
+                    "userId": "$_id.userId",
+                    "model": "$_id.model",
+                    "type": "$_id.type",
+                    "tokens": 1,
+                    "count": 1
+                }},
+                {"$merge": {
+                    "into": "usage_rollups",
+                    "on": ["granularity", "bucket", "userId", "model", "type"],
+                    "whenMatched": "replace",
+                    "whenNotMatched": "insert"
+                }}
+            ])
+
+        print("Usage rollups rebuilt")
+
+
+usage_rollup_service = UsageRollupService()
@@ -1,31 +1,12 @@
-import os
-from pinecone import Pinecone, ServerlessSpec
+from app.config import Config
 from app.services.embedding_service import EmbeddingService
+from app.services.vector_store import get_vector_store
 
 
 class VectorService:
     def __init__(self):
         self.embedding_service = EmbeddingService()
-
-        self.pc = Pinecone(
-            api_key=os.getenv("PINECONE_API_KEY")
-        )
-
-        self.index_name = os.getenv("PINECONE_INDEX_NAME")
-        self.dimension = int(os.getenv("PINECONE_DIMENSION"))
-
-        if self.index_name not in self.pc.list_indexes().names():
-            self.pc.create_index(
-                name=self.index_name,
-                dimension=self.dimension,
-                metric="cosine",
-                spec=ServerlessSpec(
-                    cloud="aws",
-                    region="us-east-1"
-                )
-            )
-
-        self.index = self.pc.Index(self.index_name)
+        self.store = get_vector_store()
 
     def add_text(
         self,
@@ -45,7 +26,7 @@ class VectorService:
             "documentId": str(metadata.get("documentId"))
         }
 
-        self.index.upsert(
+        self.store.upsert(
             vectors=[
                 {
                     "id": vector_id,
@@ -55,6 +36,50 @@ class VectorService:
             ]
         )
 
+    def add_texts(
+        self,
+        texts: list,
+        vector_ids: list,
+        metadatas: list,
+        user_id: str
+    ):
+        """
+        Embed a batch of texts in one call and upsert them in batches
+        """
+        embeddings = self.embedding_service.embed_texts(
+            texts,
+            user_id=user_id
+        )
+
+        self.upsert_embeddings(vector_ids, embeddings, metadatas, user_id)
+
+    def upsert_embeddings(
+        self,
+        vector_ids: list,
+        embeddings: list,
+        metadatas: list,
+        user_id: str
+    ):
+        """
+        Upsert already computed embeddings in VECTOR_UPSERT_BATCH_SIZE batches
+        """
+        vectors = [
+            {
+                "id": vector_id,
+                "values": embedding,
+                "metadata": {
+                    **metadata,
+                    "userId": str(user_id),
+                    "documentId": str(metadata.get("documentId"))
+                }
+            }
+            for vector_id, embedding, metadata in zip(vector_ids, embeddings, metadatas)
+        ]
+
+        batch_size = Config.VECTOR_UPSERT_BATCH_SIZE
+        for start in range(0, len(vectors), batch_size):
+            self.store.upsert(vectors=vectors[start:start + batch_size])
+
     def search(
         self,
         query: str,
@@ -67,14 +92,77 @@ class VectorService:
             user_id=user_id
         )
 
-        filter_query = {
-            "userId": str(user_id),
-            "documentId": str(document_id)
-        }
+        return self.search_by_vector(
+            query_embedding,
+            user_id=user_id,
+            document_id=document_id,
+            top_k=top_k
+        )
+
+    def search_by_vector(
+        self,
+        vector: list,
+        user_id: str,
+        document_id: str,
+        top_k: int = 12
+    ):
+        return self.store.query(
+            vector=vector,
+            user_id=user_id,
+            document_id=document_id,
+            top_k=top_k
+        )
+
+    def search_documents(
+        self,
+        vector: list,
+        user_id: str,
+        document_ids: list,
+        top_k: int = 12
+    ):
+        return self.store.query_documents(
+            vector=vector,
+            user_id=user_id,
+            document_ids=[str(document_id) for document_id in document_ids],
+            top_k=top_k
+        )
+
+    def copy_document(
+        self,
+        user_id: str,
+        source_document_id: str,
+        target_document_id: str,
+        filename: str
+    ) -> int:
+        """
+        Copy the stored vectors of one document to another without
+        re-embedding, returns the number of vectors copied
+        """
+        copied = 0
+
+        for vectors in self.store.fetch_document(str(user_id), str(source_document_id)):
+            if not vectors:
+                continue
+
+            self.store.upsert(vectors=[
+                {
+                    # Ids are "<documentId>_<chunkIndex>"
+                    "id": f"{target_document_id}_{vector['id'].rsplit('_', 1)[1]}",
+                    "values": vector["values"],
+                    "metadata": {
+                        **vector["metadata"],
+                        "documentId": str(target_document_id),
+                        "filename": filename
+                    }
+                }
+                for vector in vectors
+            ])
+            copied += len(vectors)
+
+        return copied
 
-        return self.index.query(
-            vector=query_embedding,
-            top_k=top_k,
-            include_metadata=True,
-            filter=filter_query
+    def delete_document(self, user_id: str, document_id: str):
+        self.store.delete_document(
+            user_id=str(user_id),
+            document_id=str(document_id)
         )
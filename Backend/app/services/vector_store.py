@@ -0,0 +1,444 @@
+import asyncio
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from pinecone import Pinecone, ServerlessSpec
+
+from app.config import Config
+
+
+class SearchResult:
+    """
+    Backend independent query result, matches are dicts with id, score and metadata
+    """
+
+    def __init__(self, matches: list):
+        self.matches = matches
+
+
+class VectorStore:
+    """
+    Interface every vector backend implements
+    """
+
+    def upsert(self, vectors: list):
+        raise NotImplementedError
+
+    def query(self, vector: list, user_id: str, document_id: str, top_k: int) -> SearchResult:
+        raise NotImplementedError
+
+    def fetch_document(self, user_id: str, document_id: str):
+        """
+        Yield the stored vectors of a document in batches of {id, values, metadata}
+        """
+        raise NotImplementedError
+
+    def query_documents(self, vector: list, user_id: str, document_ids: list, top_k: int) -> SearchResult:
+        """
+        Search several documents of one user and return the overall top_k.
+        Backends without a multi-document filter fan out one query per
+        document concurrently and merge the matches by score.
+        """
+        if len(document_ids) == 1:
+            return self.query(vector, user_id, document_ids[0], top_k)
+
+        with ThreadPoolExecutor(
+            max_workers=min(Config.VECTOR_FANOUT_WORKERS, len(document_ids))
+        ) as pool:
+            results = list(pool.map(
+                lambda document_id: self.query(vector, user_id, document_id, top_k),
+                document_ids
+            ))
+
+        matches = [match for result in results for match in result.matches]
+        matches.sort(key=lambda match: match["score"], reverse=True)
+        return SearchResult(matches[:top_k])
+
+    async def aquery(self, vector: list, user_id: str, document_id: str, top_k: int) -> SearchResult:
+        """
+        query() for asyncio callers, run on the default executor so the
+        event loop is not blocked by the backend client
+        """
+        return await asyncio.to_thread(self.query, vector, user_id, document_id, top_k)
+
+    def delete_document(self, user_id: str, document_id: str):
+        raise NotImplementedError
+
+
+class PineconeVectorStore(VectorStore):
+    def __init__(self):
+        self.pc = Pinecone(
+            api_key=os.getenv("PINECONE_API_KEY")
+        )
+
+        self.index_name = os.getenv("PINECONE_INDEX_NAME")
+        self.dimension = int(os.getenv("PINECONE_DIMENSION"))
+
+        if self.index_name not in self.pc.list_indexes().names():
+            self.pc.create_index(
+                name=self.index_name,
+                dimension=self.dimension,
+                metric="cosine",
+                spec=ServerlessSpec(
+                    cloud="aws",
+                    region="us-east-1"
+                )
+            )
+
+        self.index = self.pc.Index(self.index_name)
+
+    def upsert(self, vectors: list):
+        self.index.upsert(vectors=vectors)
+
+    @staticmethod
+    def _to_result(results) -> SearchResult:
+        return SearchResult([
+            {
+                "id": match["id"],
+                "score": match["score"],
+                "metadata": match["metadata"] or {}
+            }
+            for match in results.matches
+        ])
+
+    def query(self, vector: list, user_id: str, document_id: str, top_k: int) -> SearchResult:
+        results = self.index.query(
+            vector=vector,
+            top_k=top_k,
+            include_metadata=True,
+            filter={
+                "userId": str(user_id),
+                "documentId": str(document_id)
+            }
+        )
+
+        return self._to_result(results)
+
+    def query_documents(self, vector: list, user_id: str, document_ids: list, top_k: int) -> SearchResult:
+        """
+        One query over every document, filtered with $in on documentId
+        """
+        results = self.index.query(
+            vector=vector,
+            top_k=top_k,
+            include_metadata=True,
+            filter={
+                "userId": str(user_id),
+                "documentId": {"$in": [str(document_id) for document_id in document_ids]}
+            }
+        )
+
+        return self._to_result(results)
+
+    def fetch_document(self, user_id: str, document_id: str):
+        for vector_ids in self.index.list(prefix=f"{document_id}_"):
+            if not vector_ids:
+                continue
+
+            fetched = self.index.fetch(ids=vector_ids)
+            batch = [
+                {
+                    "id": vector_id,
+                    "values": list(vector.values),
+                    "metadata": dict(vector.metadata or {})
+                }
+                for vector_id, vector in fetched.vectors.items()
+            ]
+            yield [
+                vector for vector in batch
+                if vector["metadata"].get("userId") == str(user_id)
+            ]
+
+    def delete_document(self, user_id: str, document_id: str):
+        # Vector ids are "<documentId>_<chunkIndex>", serverless indexes
+        # cannot delete by metadata filter so list them by prefix instead
+        for vector_ids in self.index.list(prefix=f"{document_id}_"):
+            if vector_ids:
+                self.index.delete(ids=vector_ids)
+
+
+class _Segment:
+    """
+    Vectors of one (user, document) pair, the matrix is a read-only memmap
+    """
+
+    def __init__(self, ids: list, metadatas: list, matrix, meta: dict, signature: tuple):
+        self.ids = ids
+        self.metadatas = metadatas
+        self.matrix = matrix
+        self.meta = meta
+        self.signature = signature
+        self.rows = {vector_id: row for row, vector_id in enumerate(ids)}
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store persisted under VECTOR_DB_PATH.
+
+    Every (user, document) pair owns a directory holding an append-only
+    float32 matrix of L2-normalized vectors (vectors.f32) and one JSON line
+    per row (ids.jsonl). Searches memory-map the matrix and score it with a
+    single brute-force dot product, so cosine similarity costs one matvec.
+
+    segment.json records the dimension, the row count and the length of
+    ids.jsonl, and is replaced atomically after both files are appended. It
+    is the commit point: bytes past the recorded lengths belong to a write
+    that did not finish and are ignored on load and cut off on the next one.
+
+    Loaded segments are cached per process and checked against segment.json
+    on every use, so writes and deletes from another process (the ingestion
+    workers, the async server) are picked up.
+    """
+
+    VECTORS_FILE = "vectors.f32"
+    IDS_FILE = "ids.jsonl"
+    META_FILE = "segment.json"
+
+    def __init__(self, root: str = None):
+        self.root = root or Config.VECTOR_DB_PATH
+        self.lock = threading.RLock()
+        self.segments = {}
+
+        os.makedirs(self.root, exist_ok=True)
+
+    def _segment_dir(self, user_id: str, document_id: str) -> str:
+        return os.path.join(self.root, str(user_id), str(document_id))
+
+    @staticmethod
+    def _signature(path: str):
+        """
+        Identity of the file as last written, None when it does not exist
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _read_meta(self, segment_dir: str):
+        """
+        The committed {dimension, rows, idsBytes}, None for an empty segment
+        """
+        meta_path = os.path.join(segment_dir, self.META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        # Segments written before segment.json existed, valid only if the
+        # two files agree
+        ids_path = os.path.join(segment_dir, self.IDS_FILE)
+        if not os.path.exists(ids_path):
+            return None
+
+        with open(ids_path, "rb") as f:
+            data = f.read()
+        rows = data.count(b"\n")
+        if not rows:
+            return None
+
+        size = os.path.getsize(os.path.join(segment_dir, self.VECTORS_FILE))
+        if size % (4 * rows):
+            print(f"Ignoring inconsistent vector segment {segment_dir}")
+            return None
+
+        return {"dimension": size // (4 * rows), "rows": rows, "idsBytes": len(data)}
+
+    def _write_meta(self, segment_dir: str, meta: dict):
+        meta_path = os.path.join(segment_dir, self.META_FILE)
+        temp_path = meta_path + ".tmp"
+
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temp_path, meta_path)
+
+    def _load_segment(self, user_id: str, document_id: str):
+        key = (str(user_id), str(document_id))
+        segment_dir = self._segment_dir(user_id, document_id)
+
+        with self.lock:
+            signature = self._signature(os.path.join(segment_dir, self.META_FILE))
+            segment = self.segments.get(key)
+            if segment is not None and segment.signature == signature:
+                return segment
+
+            self.segments.pop(key, None)
+            meta = self._read_meta(segment_dir)
+            if not meta or not meta["rows"]:
+                return None
+
+            ids = []
+            metadatas = []
+            with open(os.path.join(segment_dir, self.IDS_FILE), "rb") as f:
+                for line in f.read(meta["idsBytes"]).splitlines():
+                    row = json.loads(line)
+                    ids.append(row["id"])
+                    metadatas.append(row["metadata"])
+
+            matrix = np.memmap(
+                os.path.join(segment_dir, self.VECTORS_FILE),
+                dtype=np.float32,
+                mode="r",
+                shape=(meta["rows"], meta["dimension"])
+            )
+
+            segment = _Segment(ids, metadatas, matrix, meta, signature)
+            self.segments[key] = segment
+            return segment
+
+    @staticmethod
+    def _normalize(values) -> np.ndarray:
+        vector = np.asarray(values, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def upsert(self, vectors: list):
+        grouped = {}
+        for vector in vectors:
+            metadata = vector["metadata"]
+            key = (str(metadata["userId"]), str(metadata["documentId"]))
+            grouped.setdefault(key, []).append(vector)
+
+        with self.lock:
+            for (user_id, document_id), items in grouped.items():
+                self._upsert_segment(user_id, document_id, items)
+
+    @staticmethod
+    def _append(path: str, committed: int, data: bytes):
+        """
+        Append data after the first committed bytes, dropping any tail a
+        failed write left behind
+        """
+        with open(path, "ab") as f:
+            f.truncate(committed)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _upsert_segment(self, user_id: str, document_id: str, vectors: list):
+        segment = self._load_segment(user_id, document_id)
+        segment_dir = self._segment_dir(user_id, document_id)
+        vectors_path = os.path.join(segment_dir, self.VECTORS_FILE)
+        os.makedirs(segment_dir, exist_ok=True)
+
+        if segment:
+            meta = segment.meta
+        else:
+            meta = {"dimension": len(vectors[0]["values"]), "rows": 0, "idsBytes": 0}
+
+        for vector in vectors:
+            if len(vector["values"]) != meta["dimension"]:
+                raise ValueError(
+                    f"Vector {vector['id']} has dimension {len(vector['values'])}, "
+                    f"the segment stores {meta['dimension']}"
+                )
+
+        existing = segment.rows if segment else {}
+        updates = [v for v in vectors if v["id"] in existing]
+        appends = [v for v in vectors if v["id"] not in existing]
+
+        if updates:
+            matrix = np.memmap(
+                vectors_path,
+                dtype=np.float32,
+                mode="r+",
+                shape=segment.matrix.shape
+            )
+            for vector in updates:
+                matrix[existing[vector["id"]]] = self._normalize(vector["values"])
+            matrix.flush()
+            del matrix
+
+        if appends:
+            self._append(
+                vectors_path,
+                meta["rows"] * meta["dimension"] * 4,
+                np.stack([self._normalize(vector["values"]) for vector in appends]).tobytes()
+            )
+
+            lines = "".join(
+                json.dumps({"id": vector["id"], "metadata": vector["metadata"]}) + "\n"
+                for vector in appends
+            ).encode("utf-8")
+            self._append(os.path.join(segment_dir, self.IDS_FILE), meta["idsBytes"], lines)
+
+            self._write_meta(segment_dir, {
+                "dimension": meta["dimension"],
+                "rows": meta["rows"] + len(appends),
+                "idsBytes": meta["idsBytes"] + len(lines)
+            })
+
+        self.segments.pop((user_id, document_id), None)
+
+    def query(self, vector: list, user_id: str, document_id: str, top_k: int) -> SearchResult:
+        segment = self._load_segment(user_id, document_id)
+        if segment is None:
+            return SearchResult([])
+
+        scores = segment.matrix @ self._normalize(vector)
+
+        if top_k < len(scores):
+            top = np.argpartition(-scores, top_k)[:top_k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+
+        return SearchResult([
+            {
+                "id": segment.ids[row],
+                "score": float(scores[row]),
+                "metadata": segment.metadatas[row]
+            }
+            for row in top
+        ])
+
+    def fetch_document(self, user_id: str, document_id: str):
+        segment = self._load_segment(user_id, document_id)
+        if segment is None:
+            return
+
+        batch_size = Config.VECTOR_UPSERT_BATCH_SIZE
+        for start in range(0, len(segment.ids), batch_size):
+            yield [
+                {
+                    "id": segment.ids[row],
+                    "values": segment.matrix[row].tolist(),
+                    "metadata": segment.metadatas[row]
+                }
+                for row in range(start, min(start + batch_size, len(segment.ids)))
+            ]
+
+    def delete_document(self, user_id: str, document_id: str):
+        with self.lock:
+            self.segments.pop((str(user_id), str(document_id)), None)
+            shutil.rmtree(self._segment_dir(user_id, document_id), ignore_errors=True)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_vector_store() -> VectorStore:
+    """
+    Process-wide store selected by VECTOR_STORE, shared by every VectorService
+    """
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            backend = Config.VECTOR_STORE.lower()
+
+            if backend == "pinecone":
+                _store = PineconeVectorStore()
+            elif backend == "local":
+                _store = LocalVectorStore()
+            else:
+                raise RuntimeError(f"Unknown VECTOR_STORE backend: {Config.VECTOR_STORE}")
+
+        return _store
@@ -0,0 +1,225 @@
+import atexit
+import threading
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+import app.extensions as extensions
+from app.config import Config
+from app.services.stats_service import stats_service
+from app.services.usage_rollup_service import usage_rollup_service
+
+
+class WriteBehindBuffer:
+    """
+    Collects usage_logs and chat_messages writes in memory and persists them
+    with insert_many from a background thread.
+
+    Usage events are pre-aggregated per (user, model, type, minute), so a
+    document ingestion produces a handful of usage rows instead of one per
+    chunk. A flush happens every WRITE_BUFFER_FLUSH_SECONDS, as soon as
+    WRITE_BUFFER_MAX_ITEMS writes are pending, and at interpreter exit.
+
+    Rows get their _id before the first insert attempt. A failed flush puts
+    back only the rows Mongo did not store; a row rejected as a duplicate
+    _id was stored by an earlier attempt. At most WRITE_BUFFER_MAX_PENDING
+    writes wait in memory, the oldest are dropped past that.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.usage = {}
+        self.usage_rows = []
+        self.messages = []
+        self.dropped = 0
+        self.thread = None
+
+    def _ensure_started(self):
+        if self.thread is not None:
+            return
+
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self._flush_loop,
+                    name="write-behind-flusher",
+                    daemon=True
+                )
+                self.thread.start()
+                atexit.register(self.flush)
+
+    def _pending(self) -> int:
+        return len(self.usage) + len(self.usage_rows) + len(self.messages)
+
+    def log_usage(self, user_id, usage_type: str, tokens: int, model: str):
+        self._ensure_started()
+
+        minute = datetime.utcnow().replace(second=0, microsecond=0)
+        key = (str(user_id), model, usage_type, minute)
+
+        with self.lock:
+            entry = self.usage.get(key)
+            if entry is None:
+                self.usage[key] = {"tokens": tokens, "count": 1}
+            else:
+                entry["tokens"] += tokens
+                entry["count"] += 1
+
+            full = self._pending() >= Config.WRITE_BUFFER_MAX_ITEMS
+
+        if full:
+            self.wakeup.set()
+
+    def add_chat_message(self, message: dict):
+        self.add_chat_messages([message])
+
+    def add_chat_messages(self, messages: list):
+        """
+        Queue several messages at once, they are persisted by the same insert_many
+        """
+        self._ensure_started()
+
+        with self.lock:
+            self.messages.extend(messages)
+            full = self._pending() >= Config.WRITE_BUFFER_MAX_ITEMS
+
+        if full:
+            self.wakeup.set()
+
+    def _flush_loop(self):
+        while True:
+            self.wakeup.wait(Config.WRITE_BUFFER_FLUSH_SECONDS)
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                usage, self.usage = self.usage, {}
+                usage_rows, self.usage_rows = self.usage_rows, []
+                messages, self.messages = self.messages, []
+
+            if not usage and not usage_rows and not messages:
+                return
+
+            if extensions.db is None:
+                print(
+                    f"Write buffer: dropping {len(usage) + len(usage_rows) + len(messages)} writes, "
+                    "MongoDB not initialized"
+                )
+                return
+
+            for message in messages:
+                message.setdefault("_id", ObjectId())
+
+            usage_rows += [
+                {
+                    "_id": ObjectId(),
+                    "userId": ObjectId(user_id),
+                    "type": usage_type,
+                    "tokens": entry["tokens"],
+                    "count": entry["count"],
+                    "model": model,
+                    "createdAt": minute
+                }
+                for (user_id, model, usage_type, minute), entry in usage.items()
+            ]
+
+            if messages:
+                stored, failed = self._insert("chat_messages", messages)
+                self._requeue([], failed)
+
+                if stored:
+                    queries_per_user = {}
+                    for message in stored:
+                        counters = queries_per_user.setdefault(message["userId"], {"queryCount": 0})
+                        counters["queryCount"] += 1
+
+                    self._update_stats(
+                        lambda: stats_service.record_queries([m["createdAt"] for m in stored])
+                    )
+                    self._update_stats(lambda: stats_service.increment_users(queries_per_user))
+
+            if usage_rows:
+                stored, failed = self._insert("usage_logs", usage_rows)
+                self._requeue(failed, [])
+
+                if stored:
+                    stored_usage = {}
+                    tokens_per_user = {}
+                    for row in stored:
+                        user_id = str(row["userId"])
+                        key = (user_id, row["model"], row["type"], row["createdAt"])
+                        entry = stored_usage.setdefault(key, {"tokens": 0, "count": 0})
+                        entry["tokens"] += row["tokens"]
+                        entry["count"] += row["count"]
+
+                        counters = tokens_per_user.setdefault(user_id, {"tokenCount": 0})
+                        counters["tokenCount"] += row["tokens"]
+
+                    self._update_stats(
+                        lambda: stats_service.increment(
+                            totalTokens=sum(row["tokens"] for row in stored)
+                        )
+                    )
+                    self._update_stats(lambda: stats_service.increment_users(tokens_per_user))
+                    self._update_stats(lambda: usage_rollup_service.record(stored_usage))
+
+    def _insert(self, collection: str, rows: list):
+        """
+        insert_many that returns (stored, failed) rows. Duplicate _id errors
+        count as stored: the row went in on an attempt that reported a
+        failure, so it has not been counted in the stats yet.
+        """
+        try:
+            extensions.db[collection].insert_many(rows, ordered=False)
+            return rows, []
+
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            failed_indexes = {error["index"] for error in errors if error.get("code") != 11000}
+            print(f"Write buffer {collection} flush: {len(errors)} of {len(rows)} rows failed")
+
+        except Exception as e:
+            print(f"Write buffer {collection} flush failed:", e)
+            return [], rows
+
+        stored = [row for index, row in enumerate(rows) if index not in failed_indexes]
+        failed = [row for index, row in enumerate(rows) if index in failed_indexes]
+        return stored, failed
+
+    def _update_stats(self, update):
+        try:
+            update()
+        except Exception as e:
+            print("Write buffer stats update failed:", e)
+
+    def _requeue(self, usage_rows: list, messages: list):
+        if not usage_rows and not messages:
+            return
+
+        with self.lock:
+            self.usage_rows = usage_rows + self.usage_rows
+            self.messages = messages + self.messages
+
+            overflow = self._pending() - Config.WRITE_BUFFER_MAX_PENDING
+            if overflow > 0:
+                dropped_messages = min(overflow, len(self.messages))
+                dropped_usage = min(overflow - dropped_messages, len(self.usage_rows))
+
+                del self.messages[:dropped_messages]
+                del self.usage_rows[:dropped_usage]
+                self.dropped += dropped_messages + dropped_usage
+                dropped_total = self.dropped
+
+        if overflow > 0:
+            print(
+                f"Write buffer full, dropped the {dropped_messages + dropped_usage} oldest writes "
+                f"({dropped_total} since start)"
+            )
+
+
+write_buffer = WriteBehindBuffer()
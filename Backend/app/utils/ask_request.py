@@ -0,0 +1,134 @@
+from bson import ObjectId
+from bson.errors import InvalidId
+
+
+DOCUMENT_NOT_FOUND = "Document not found or access denied"
+
+
+def validate_ask_payload(data):
+    """
+    Validates an ask payload without touching the database, shared by the
+    Flask and asyncio servers. Returns (error_message, question, document_id),
+    error_message is None when the payload is valid.
+    """
+    if not data:
+        return "Request body required", None, None
+
+    if "question" not in data or "documentId" not in data:
+        return "Both question and documentId are required", None, None
+
+    question = data["question"]
+    message = validate_question(question)
+    if message:
+        return message, None, None
+
+    document_id = data["documentId"]
+    if not _is_object_id(document_id):
+        return "Invalid documentId", None, None
+
+    return None, question, document_id
+
+
+def validate_batch_payload(data, max_questions: int):
+    """
+    Same checks as validate_ask_payload for a {questions: [...], documentId}
+    payload. Returns (error_message, questions, document_id).
+    """
+    if not data:
+        return "Request body required", None, None
+
+    if "questions" not in data or "documentId" not in data:
+        return "Both questions and documentId are required", None, None
+
+    questions = data["questions"]
+    if not isinstance(questions, list) or not questions:
+        return "questions must be a non-empty list", None, None
+
+    if len(questions) > max_questions:
+        return f"Too many questions (max {max_questions})", None, None
+
+    for position, question in enumerate(questions):
+        message = validate_question(question)
+        if message:
+            return f"Question {position + 1}: {message}", None, None
+
+    document_id = data["documentId"]
+    if not _is_object_id(document_id):
+        return "Invalid documentId", None, None
+
+    return None, questions, document_id
+
+
+def validate_documents_payload(data, max_documents: int):
+    """
+    Checks a {question, documentIds} payload, documentIds is optional and
+    means every enabled document of the user when left out. Returns
+    (error_message, question, document_ids), document_ids may be None.
+    """
+    if not data:
+        return "Request body required", None, None
+
+    if "question" not in data:
+        return "question is required", None, None
+
+    question = data["question"]
+    message = validate_question(question)
+    if message:
+        return message, None, None
+
+    document_ids = data.get("documentIds")
+    if document_ids is None:
+        return None, question, None
+
+    if not isinstance(document_ids, list) or not document_ids:
+        return "documentIds must be a non-empty list", None, None
+
+    if len(document_ids) > max_documents:
+        return f"Too many documents (max {max_documents})", None, None
+
+    if not all(_is_object_id(document_id) for document_id in document_ids):
+        return "Invalid documentId", None, None
+
+    return None, question, list(dict.fromkeys(document_ids))
+
+
+def validate_question(question):
+    if not isinstance(question, str) or not question.strip():
+        return "Question cannot be empty"
+
+    if len(question) < 3:
+        return "Question is too short"
+
+    if len(question) > 500:
+        return "Question is too long (max 500 characters)"
+
+    return None
+
+
+def _is_object_id(value) -> bool:
+    try:
+        ObjectId(value)
+        return True
+    except (InvalidId, TypeError):
+        return False
+
+
+def owned_documents_query(document_ids, user_id: str) -> dict:
+    """
+    Enabled documents of user_id, restricted to document_ids unless it is None
+    """
+    query = {
+        "userId": ObjectId(user_id),
+        "enabled": True
+    }
+    if document_ids is not None:
+        query["_id"] = {"$in": [ObjectId(document_id) for document_id in document_ids]}
+    return query
+
+
+def owned_document_query(document_id: str, user_id: str) -> dict:
+    return {
+        "_id": ObjectId(document_id),
+        "userId": ObjectId(user_id),
+        "enabled": True
+    }
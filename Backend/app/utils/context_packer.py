@@ -0,0 +1,168 @@
+import re
+from typing import List, Optional, Tuple
+
+
+def _count_tokens(text: str) -> int:
+    return len(text.split())
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = text.lower().split()
+    if len(words) < size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _overlap_length(
+    left: str,
+    right: str,
+    known_overlap: Optional[int] = None,
+    min_words: int = 2,
+    max_overlap: int = 2000
+) -> int:
+    """
+    Length of the longest suffix of left that is also a prefix of right.
+
+    Only the chunker's known character overlap, or a run of at least
+    min_words whole words on both sides, counts; a shorter or mid-word
+    match is a coincidence between chunks that do not overlap.
+    """
+    if known_overlap and left.endswith(right[:known_overlap]):
+        return known_overlap
+
+    limit = min(len(left), len(right), max_overlap)
+    ends = [match.start() for match in re.finditer(r"\s", right[:limit + 1])]
+    if len(right) <= limit:
+        ends.append(len(right))
+
+    for length in reversed(ends):
+        prefix = right[:length]
+        if (
+            length
+            and left.endswith(prefix)
+            and (length == len(left) or left[-length - 1].isspace())
+            and len(prefix.split()) >= min_words
+        ):
+            return length
+    return 0
+
+
+def _saved_tokens(left: str, right: str, known_overlap: Optional[int]) -> int:
+    """
+    Tokens of right that merging it after left removes
+    """
+    overlap = _overlap_length(left, right, known_overlap)
+    if not overlap:
+        return 0
+    return _count_tokens(right) - _count_tokens(right[overlap:])
+
+
+def _merge_segments(selected: List[dict], known_overlap: Optional[int] = None) -> List[Tuple[int, str]]:
+    """
+    Merge runs of consecutive chunkIndex values of the same document into one
+    segment with the repeated overlap removed. Returns (best rank, text) pairs.
+    """
+    ordered = sorted(selected, key=lambda c: (c["documentId"], c["chunkIndex"]))
+    segments = []
+
+    for chunk in ordered:
+        previous = segments[-1] if segments else None
+
+        if (
+            previous
+            and previous["documentId"] == chunk["documentId"]
+            and previous["lastIndex"] + 1 == chunk["chunkIndex"]
+        ):
+            overlap = _overlap_length(previous["lastText"], chunk["text"], known_overlap)
+            previous["parts"].append(chunk["text"][overlap:] if overlap else "\n\n" + chunk["text"])
+            previous["lastIndex"] = chunk["chunkIndex"]
+            previous["lastText"] = chunk["text"]
+            previous["rank"] = min(previous["rank"], chunk["rank"])
+        else:
+            segments.append({
+                "documentId": chunk["documentId"],
+                "lastIndex": chunk["chunkIndex"],
+                "lastText": chunk["text"],
+                "rank": chunk["rank"],
+                "parts": [chunk["text"]]
+            })
+
+    segments.sort(key=lambda s: s["rank"])
+    return [(segment["rank"], "".join(segment["parts"])) for segment in segments]
+
+
+def pack_context(
+    chunks: List[dict],
+    token_budget: int,
+    duplicate_threshold: float = 0.9,
+    known_overlap: Optional[int] = None
+) -> Tuple[str, dict]:
+    """
+    Assemble a prompt context from ranked chunks (dicts with documentId,
+    chunkIndex and text, best match first).
+
+    Near-duplicates (word 3-gram Jaccard >= duplicate_threshold) of a better
+    ranked chunk are dropped, adjacent chunks are merged with their overlap
+    removed, and chunks are admitted in rank order while the merged context
+    fits token_budget. known_overlap is the fixed chunker's overlap in
+    characters, when chunks come from it. Returns the context and its stats:
+    token counts, where promptTokensSaved is measured against joining every
+    chunk unchanged, and usedDocuments, the documents of the packed chunks
+    in order of their best match.
+    """
+    raw_tokens = sum(_count_tokens(chunk["text"]) for chunk in chunks)
+
+    kept = []
+    kept_shingles = []
+    duplicates = 0
+
+    for rank, chunk in enumerate(chunks):
+        shingles = _shingles(chunk["text"])
+
+        if any(
+            len(shingles & other) / len(shingles | other) >= duplicate_threshold
+            for other in kept_shingles
+        ):
+            duplicates += 1
+            continue
+
+        kept.append({**chunk, "rank": rank})
+        kept_shingles.append(shingles)
+
+    selected = []
+    positions = {}
+    estimated_tokens = 0
+
+    # Admission only needs what a chunk adds next to its selected neighbours,
+    # the segments are merged once at the end
+    for chunk in kept:
+        document_id, index = chunk["documentId"], chunk["chunkIndex"]
+        previous = positions.get((document_id, index - 1))
+        following = positions.get((document_id, index + 1))
+
+        tokens = _count_tokens(chunk["text"])
+        if previous:
+            tokens -= _saved_tokens(previous["text"], chunk["text"], known_overlap)
+        if following:
+            tokens -= _saved_tokens(chunk["text"], following["text"], known_overlap)
+
+        # The best match is always used, even when it alone exceeds the budget
+        if estimated_tokens + tokens <= token_budget or not selected:
+            selected.append(chunk)
+            positions[(document_id, index)] = chunk
+            estimated_tokens += tokens
+
+    segments = _merge_segments(selected, known_overlap)
+    packed_tokens = sum(_count_tokens(text) for _, text in segments)
+
+    context = "\n\n".join(text for _, text in segments)
+
+    return context, {
+        "retrievedChunks": len(chunks),
+        "usedChunks": len(selected),
+        "duplicatesDropped": duplicates,
+        "rawTokens": raw_tokens,
+        "promptTokens": packed_tokens,
+        "promptTokensSaved": raw_tokens - packed_tokens,
+        "usedDocuments": list(dict.fromkeys(chunk["documentId"] for chunk in selected))
+    }
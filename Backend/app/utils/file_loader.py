@@ -1,5 +1,16 @@
-from pypdf import PdfReader
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Tuple
 import os
+import threading
+
+from pypdf import PdfReader
+
+from app.config import Config
+from app.utils.worker_pool import spawn_pool
+
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
 
 
 def load_text_from_file(file_path: str)-> str :
@@ -7,41 +18,106 @@ def load_text_from_file(file_path: str)-> str :
     """
     Load text from PDF or TXT file.
     """
-    print(f"Loading file: {file_path}")
+    return "".join(load_pages_from_file(file_path))
 
-    if not os.path.exists(file_path):
-        print(" File does not exist")
-        raise FileNotFoundError("File not found")
+
+def load_pages_from_file(file_path: str) -> List[str]:
+    """
+    Load the text of every page, a TXT file is a single page.
+    """
+    if file_path.endswith('.txt'):
+        _check_file(file_path)
+        return [_load_txt(file_path)]
+
+    return [text for _, text in iter_pages(file_path)]
+
+
+def iter_pages(file_path: str) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_number, text) pairs without holding the whole document.
+    TXT files are yielded in TXT_READ_BLOCK sized pieces, all on page 1.
+    """
+    _check_file(file_path)
 
     if file_path.endswith(".pdf"):
-        return _load_pdf(file_path)   
-         
+        return _iter_pdf(file_path)
+
     elif file_path.endswith('.txt'):
-        return _load_txt(file_path)
+        return _iter_txt(file_path)
 
     else:
         print(" Unsupported file format")
         raise ValueError("Only PDF and TXT files are supported")
 
 
+def _check_file(file_path: str):
+    print(f"Loading file: {file_path}")
+
+    if not os.path.exists(file_path):
+        print(" File does not exist")
+        raise FileNotFoundError("File not found")
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = spawn_pool(Config.PDF_WORKERS)
+        return _pdf_pool
+
+
+def _extract_page_range(file_path: str, start: int, end: int) -> List[str]:
+    reader = PdfReader(file_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
 
 
-def _load_pdf(file_path: str) -> str :
+def _iter_pdf(file_path: str) -> Iterator[Tuple[int, str]]:
     print("Detected PDF file")
 
     reader = PdfReader(file_path)
-    text = ""
+    page_count = len(reader.pages)
 
+    if Config.PDF_WORKERS > 1 and page_count >= Config.PDF_PARALLEL_MIN_PAGES:
+        range_size = max(1, -(-page_count // (Config.PDF_WORKERS * 4)))
 
-    for i, page in enumerate(reader.pages):
-        page_text = page.extract_text() or ""
-        text += page_text
-        print(f"Read page {i + 1}")
+        print(f"Extracting {page_count} pages on {Config.PDF_WORKERS} processes")
 
-    print(f"PDF loaded successfully")
-    print(f"Extracted text length: {len(text)} characters")
+        # Keep at most two ranges per worker in flight so finished pages
+        # never pile up ahead of the consumer
+        pool = _get_pdf_pool()
+        pending = []
+        next_start = 0
+        page_number = 1
 
-    return text
+        while next_start < page_count or pending:
+            while next_start < page_count and len(pending) < Config.PDF_WORKERS * 2:
+                end = min(next_start + range_size, page_count)
+                pending.append(pool.submit(_extract_page_range, file_path, next_start, end))
+                next_start = end
+
+            for text in pending.pop(0).result():
+                yield page_number, text
+                page_number += 1
+    else:
+        for index, page in enumerate(reader.pages):
+            yield index + 1, page.extract_text() or ""
+
+    print(f"PDF loaded successfully ({page_count} pages)")
+
+
+
+def _iter_txt(file_path: str) -> Iterator[Tuple[int, str]]:
+    print("Detected TXT file")
+
+    with open(file_path, "r" , encoding="utf-8") as f:
+        while True:
+            block = f.read(Config.TXT_READ_BLOCK)
+            if not block:
+                break
+            yield 1, block
+
+    print("TXT loaded sucessfully!")
 
 
 
@@ -51,11 +127,9 @@ def _load_txt(file_path:str) -> str:
     with open(file_path, "r" , encoding="utf-8") as f:
         text = f.read()
 
-    
+
     print("TXT loaded sucessfully!")
     print(f"Extracted text length: {len(text)} characters")
 
 
     return text
-
-
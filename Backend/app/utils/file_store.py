@@ -0,0 +1,45 @@
+import hashlib
+from typing import BinaryIO, Tuple
+
+from app.config import Config
+
+
+class FileTooLarge(ValueError):
+    pass
+
+
+def save_stream(stream: BinaryIO, file_path: str, max_bytes: int = None) -> Tuple[str, int]:
+    """
+    Copy stream to file_path block by block, hashing the bytes on the way.
+    Returns the sha256 hex digest and the number of bytes written, raises
+    FileTooLarge as soon as more than max_bytes arrived.
+    """
+    digest = hashlib.sha256()
+    size = 0
+
+    with open(file_path, "wb") as f:
+        while True:
+            block = stream.read(Config.UPLOAD_READ_BLOCK)
+            if not block:
+                break
+            size += len(block)
+            if max_bytes is not None and size > max_bytes:
+                raise FileTooLarge(f"File exceeds {max_bytes} bytes")
+
+            digest.update(block)
+            f.write(block)
+
+    return digest.hexdigest(), size
+
+
+def hash_file(file_path: str) -> str:
+    digest = hashlib.sha256()
+
+    with open(file_path, "rb") as f:
+        while True:
+            block = f.read(Config.UPLOAD_READ_BLOCK)
+            if not block:
+                break
+            digest.update(block)
+
+    return digest.hexdigest()
@@ -0,0 +1,73 @@
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.config import Config
+
+
+def encode_cursor(created_at: datetime, object_id) -> str:
+    """
+    Opaque cursor for the (createdAt, _id) position of a row.
+    """
+    raw = f"{created_at.isoformat()}|{object_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, object_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), ObjectId(object_id)
+    except (ValueError, InvalidId, UnicodeError):
+        raise ValueError("Invalid cursor")
+
+
+def parse_limit(value: Optional[str]) -> int:
+    if value is None:
+        return Config.PAGE_SIZE_DEFAULT
+
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+
+    return max(1, min(limit, Config.PAGE_SIZE_MAX))
+
+
+def keyset_filter(cursor: Optional[str], ascending: bool = False) -> dict:
+    """
+    Filter matching the rows after cursor in (createdAt, _id) order, so every
+    page is an index range scan regardless of its depth.
+    """
+    if not cursor:
+        return {}
+
+    created_at, object_id = decode_cursor(cursor)
+    op = "$gt" if ascending else "$lt"
+
+    return {
+        "$or": [
+            {"createdAt": {op: created_at}},
+            {"createdAt": created_at, "_id": {op: object_id}}
+        ]
+    }
+
+
+def keyset_sort(ascending: bool = False) -> List[tuple]:
+    direction = 1 if ascending else -1
+    return [("createdAt", direction), ("_id", direction)]
+
+
+def split_page(rows: list, limit: int) -> Tuple[list, Optional[str]]:
+    """
+    Trim rows fetched with limit + 1 and return (page, nextCursor).
+    """
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last["createdAt"], last["_id"])
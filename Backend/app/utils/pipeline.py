@@ -0,0 +1,74 @@
+import queue
+import threading
+from typing import Iterable, Iterator, List
+
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def batched(items: Iterable, size: int) -> Iterator[List]:
+    """
+    Group an iterable into lists of at most size items.
+    """
+    batch = []
+
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def background(items: Iterable, maxsize: int, name: str = "pipeline-stage") -> Iterator:
+    """
+    Run the iteration of items on its own thread, handing results over
+    through a bounded queue so the producer never runs more than maxsize
+    items ahead of the consumer. Producer exceptions are re-raised in the
+    consumer; closing the returned generator stops the producer.
+    """
+    buffer = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            close = getattr(items, "close", None)
+            if close:
+                close()
+
+    thread = threading.Thread(target=produce, name=name, daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
@@ -1,4 +1,6 @@
-from typing import List
+import re
+from bisect import bisect_right
+from typing import Iterable, Iterator, List, Tuple
 
 def chunk_text(
     text: str,
@@ -8,6 +10,9 @@ def chunk_text(
     """
     Split text into overlapping chunks.
     """
+    if chunk_overlap >= chunk_size:
+        raise ValueError("chunk_overlap must be smaller than chunk_size")
+
     chunks = []
     start = 0
     text_length = len(text)
@@ -19,3 +24,183 @@ def chunk_text(
         start = end - chunk_overlap
 
     return chunks
+
+
+def iter_chunks(
+    pages: Iterable[Tuple[int, str]],
+    chunk_size: int = 500,
+    chunk_overlap: int = 100
+) -> Iterator[Tuple[int, str]]:
+    """
+    Streaming form of chunk_text over (page_number, text) pieces.
+
+    Yields (page_number, chunk) with exactly the chunks chunk_text would
+    produce for the joined text, while only buffering the current piece plus
+    the unfinished tail of the previous one.
+    """
+    if chunk_overlap >= chunk_size:
+        raise ValueError("chunk_overlap must be smaller than chunk_size")
+
+    buffer = ""
+    buffer_start = 0
+    start = 0
+    page_starts = []
+
+    def page_at(offset: int) -> int:
+        index = bisect_right([position for position, _ in page_starts], offset) - 1
+        return page_starts[max(index, 0)][1]
+
+    for page_number, text in pages:
+        if not text:
+            continue
+
+        page_starts.append((buffer_start + len(buffer), page_number))
+        buffer += text
+
+        while start + chunk_size <= buffer_start + len(buffer):
+            offset = start - buffer_start
+            yield page_at(start), buffer[offset:offset + chunk_size]
+            start += chunk_size - chunk_overlap
+
+        if start > buffer_start:
+            current_page = page_at(start)
+            buffer = buffer[start - buffer_start:]
+            buffer_start = start
+            page_starts = [(start, current_page)] + [
+                entry for entry in page_starts if entry[0] > start
+            ]
+
+    end = buffer_start + len(buffer)
+    while start < end:
+        offset = start - buffer_start
+        yield page_at(start), buffer[offset:offset + chunk_size]
+        start += chunk_size - chunk_overlap
+
+
+# A sentence ends at ., ! or ? (plus closing quotes/brackets) followed by
+# whitespace; a blank line ends a paragraph
+_BOUNDARY = re.compile(r"(?<=[.!?])([\"')\]]*)\s+|\n[ \t]*\n\s*")
+
+
+def _count_tokens(text: str) -> int:
+    return len(text.split())
+
+
+def _iter_sentences(
+    pages: Iterable[Tuple[int, str]],
+    max_words: int = None
+) -> Iterator[Tuple[int, str, bool]]:
+    """
+    Yield (page_number, sentence, ends_paragraph) in one pass over the pages.
+    Only the unterminated tail of a page is carried into the next one; once
+    it holds more than max_words words it is yielded as a sentence up to its
+    last word, so text without terminators is not re-copied without bound.
+    """
+    carry = ""
+    carry_page = None
+
+    for page_number, text in pages:
+        if not text:
+            continue
+
+        if carry:
+            text = carry + text
+        else:
+            carry_page = page_number
+
+        position = 0
+        for match in _BOUNDARY.finditer(text):
+            end = match.start() if match.group(1) is None else match.end(1)
+            sentence = text[position:end].strip()
+            if sentence:
+                yield carry_page, sentence, text.count("\n", end, match.end()) >= 2
+            position = match.end()
+            carry_page = page_number
+
+        carry = text[position:]
+
+        if max_words and len(carry) > max_words:
+            words = carry.split()
+            if len(words) > max_words:
+                # The last word may continue in the next piece
+                tail = "" if carry[-1].isspace() else words.pop()
+                yield carry_page, " ".join(words), False
+                carry = tail
+                carry_page = page_number
+
+    carry = carry.strip()
+    if carry:
+        yield carry_page, carry, True
+
+
+def iter_structured_chunks(
+    pages: Iterable[Tuple[int, str]],
+    max_tokens: int = 200,
+    overlap_tokens: int = 30
+) -> Iterator[Tuple[int, str]]:
+    """
+    Pack whole sentences into chunks of at most max_tokens tokens.
+
+    Chunks never cut a word or sentence unless a single sentence is longer
+    than the budget. Overlap is adaptive: when a chunk closes in the middle
+    of a paragraph its last sentences (up to overlap_tokens) open the next
+    chunk, when it closes on a paragraph boundary nothing is repeated.
+    Yields (page_number, chunk) where the page is that of the first sentence.
+    """
+    if overlap_tokens >= max_tokens:
+        raise ValueError("overlap_tokens must be smaller than max_tokens")
+
+    parts = []
+    tokens = 0
+    page = None
+
+    def render():
+        pieces = []
+        for index, (_, sentence, _, ends_paragraph) in enumerate(parts):
+            pieces.append(sentence)
+            if index < len(parts) - 1:
+                pieces.append("\n\n" if ends_paragraph else " ")
+        return "".join(pieces)
+
+    def overlap(budget: int):
+        if not parts or parts[-1][3]:
+            return [], 0
+
+        kept = []
+        kept_tokens = 0
+        for part in reversed(parts):
+            if kept_tokens + part[2] > budget:
+                break
+            kept.insert(0, part)
+            kept_tokens += part[2]
+        return kept, kept_tokens
+
+    for sentence_page, sentence, ends_paragraph in _iter_sentences(pages, max_tokens):
+        sentence_tokens = _count_tokens(sentence)
+
+        if sentence_tokens > max_tokens:
+            if parts:
+                yield page, render()
+                parts, tokens = [], 0
+
+            words = sentence.split()
+            for start in range(0, len(words), max_tokens - overlap_tokens):
+                yield sentence_page, " ".join(words[start:start + max_tokens])
+                if start + max_tokens >= len(words):
+                    break
+            continue
+
+        if parts and tokens + sentence_tokens > max_tokens:
+            yield page, render()
+            # Only as much overlap as still fits next to the new sentence
+            parts, tokens = overlap(min(overlap_tokens, max_tokens - sentence_tokens))
+            page = parts[0][0] if parts else None
+
+        if not parts:
+            page = sentence_page
+
+        parts.append((sentence_page, sentence, sentence_tokens, ends_paragraph))
+        tokens += sentence_tokens
+
+    if parts:
+        yield page, render()
@@ -0,0 +1,24 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+
+def in_pool_worker() -> bool:
+    """
+    True inside a multiprocessing child. Spawned children re-import the
+    entry module (run.py) as __mp_main__, so anything it starts at import
+    would start again in every worker. parent_process() is only set after
+    that import, the process name is set before it.
+    """
+    return (
+        multiprocessing.current_process().name != "MainProcess"
+        or multiprocessing.parent_process() is not None
+    )
+
+
+def spawn_pool(max_workers: int) -> ProcessPoolExecutor:
+    # spawn, not fork: the API and ingestion run threads and forking a
+    # threaded process can deadlock the child
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn")
+    )
@@ -0,0 +1,98 @@
+"""
+Measure chat request latency while logins hash passwords in the same process.
+
+    python bench_auth_load.py                  # 8 concurrent logins, 4 s per mode
+    python bench_auth_load.py --logins 16 --seconds 8
+
+A chat request is simulated by the Python-side work of one /chat/ask (prompt
+assembly and JSON encoding, about a millisecond) followed by a short wait
+standing in for Ollama. Three modes run back to back: no logins, logins
+verified inline on the request threads (the old behaviour) and logins
+verified through the PasswordHasher process pool.
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("JWT_SECRET", "bench")
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from app.config import Config
+from app.services.password_hasher import password_hasher
+
+PASSWORD = "Benchmark1"
+CONTEXT = " ".join(f"chunk {i} text about vectors and caches" for i in range(400))
+
+
+def chat_request():
+    prompt = f"Context:\n{CONTEXT}\n\nQuestion: what is cached?\n\nAnswer:"
+    body = json.dumps({"model": "bench", "prompt": prompt, "stream": False})
+    json.loads(body)
+    time.sleep(0.005)
+
+
+def login_loop(stop: threading.Event, verify, stored_hash: str, counter: list):
+    while not stop.is_set():
+        verify(stored_hash, PASSWORD)
+        counter.append(1)
+
+
+def run_mode(name: str, verify, logins: int, seconds: float, stored_hash: str):
+    stop = threading.Event()
+    completed = []
+    threads = [
+        threading.Thread(target=login_loop, args=(stop, verify, stored_hash, completed), daemon=True)
+        for _ in range(logins if verify else 0)
+    ]
+    for thread in threads:
+        thread.start()
+
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        chat_request()
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    print(
+        f"{name:<8} chat_requests={len(latencies):>5}  "
+        f"p50={statistics.median(latencies):>7.1f} ms  "
+        f"p95={latencies[int(len(latencies) * 0.95) - 1]:>7.1f} ms  "
+        f"max={latencies[-1]:>7.1f} ms  "
+        f"logins/s={len(completed) / seconds:>6.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=8, help="concurrent login threads")
+    parser.add_argument("--seconds", type=float, default=4)
+    args = parser.parse_args()
+
+    stored_hash = generate_password_hash(PASSWORD, method=Config.PASSWORD_HASH_METHOD)
+
+    # Start the pool workers before timing anything
+    password_hasher.verify(stored_hash, PASSWORD)
+
+    print(
+        f"{Config.PASSWORD_HASH_METHOD}, {args.logins} login threads, "
+        f"{Config.PASSWORD_HASH_WORKERS} hash workers, {os.cpu_count()} CPUs\n"
+    )
+
+    run_mode("idle", None, args.logins, args.seconds, stored_hash)
+    run_mode("inline", check_password_hash, args.logins, args.seconds, stored_hash)
+    run_mode("pool", password_hasher.verify, args.logins, args.seconds, stored_hash)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Compare the fixed character chunker with the structure-aware chunker.
+
+    python bench_chunking.py                 # synthetic ~1 MB document
+    python bench_chunking.py notes.txt       # any UTF-8 text file
+"""
+import random
+import sys
+import time
+
+from app.utils.text_chunker import chunk_text, iter_structured_chunks
+
+WORDS = (
+    "data index vector query model chunk token embedding search result "
+    "document page section network latency throughput memory process "
+    "system user request response cache storage value system design"
+).split()
+
+
+def synthetic_text(paragraphs: int = 2500, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    out = []
+
+    for _ in range(paragraphs):
+        sentences = []
+        for _ in range(rng.randint(2, 8)):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(6, 28))]
+            sentences.append(" ".join(words).capitalize() + rng.choice(".!?"))
+        out.append(" ".join(sentences))
+
+    return "\n\n".join(out)
+
+
+def cut_words(chunks, text_words: set) -> int:
+    cut = 0
+    for chunk in chunks:
+        words = chunk.split()
+        if words and (words[0] not in text_words or words[-1].rstrip(".!?") not in text_words):
+            cut += 1
+    return cut
+
+
+def measure(name: str, run, source_tokens: int, text_words: set, repeat: int = 3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunks = run()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    embedded_tokens = sum(len(chunk.split()) for chunk in chunks)
+
+    print(
+        f"{name:<12} chunks={len(chunks):>6}  "
+        f"avg_tokens={embedded_tokens / max(len(chunks), 1):>6.1f}  "
+        f"embedded_tokens={embedded_tokens:>8}  "
+        f"redundancy={embedded_tokens / source_tokens:>5.2f}x  "
+        f"cut_chunks={cut_words(chunks, text_words):>6}  "
+        f"time={best * 1000:>8.1f} ms"
+    )
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "r", encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = synthetic_text()
+
+    source_tokens = len(text.split())
+    text_words = {word.rstrip(".!?") for word in text.split()}
+
+    print(f"Source: {len(text)} characters, {source_tokens} tokens\n")
+
+    measure(
+        "fixed",
+        lambda: chunk_text(text, chunk_size=500, chunk_overlap=100),
+        source_tokens,
+        text_words
+    )
+    measure(
+        "structured",
+        lambda: [chunk for _, chunk in iter_structured_chunks([(1, text)], 200, 30)],
+        source_tokens,
+        text_words
+    )
+
+
+if __name__ == "__main__":
+    main()
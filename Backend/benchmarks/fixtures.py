@@ -0,0 +1,127 @@
+"""
+Synthetic inputs for the benchmarks: prose-like text and text-only PDFs.
+"""
+import random
+
+from bson import ObjectId
+from datetime import datetime
+
+WORDS = (
+    "data index vector query model chunk token embedding search result "
+    "document page section network latency throughput memory process "
+    "system user request response cache storage value design manual "
+    "install configure service network error retry backup restore"
+).split()
+
+
+def synthetic_text(size_bytes: int, seed: int = 7) -> str:
+    """
+    Paragraphs of random sentences, about size_bytes long
+    """
+    rng = random.Random(seed)
+    paragraphs = []
+    length = 0
+
+    while length < size_bytes:
+        sentences = []
+        for _ in range(rng.randint(2, 8)):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(6, 28))]
+            sentences.append(" ".join(words).capitalize() + rng.choice(".!?"))
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 2
+
+    return "\n\n".join(paragraphs)
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _wrap(text: str, width: int = 90) -> list:
+    lines = []
+    for paragraph in text.split("\n\n"):
+        line = ""
+        for word in paragraph.split():
+            if len(line) + len(word) + 1 > width:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+        if line:
+            lines.append(line)
+        lines.append("")
+    return lines
+
+
+def write_pdf(path: str, pages: int, seed: int = 7):
+    """
+    Write a text-only PDF of the given page count, about 55 lines per page,
+    with a valid xref table so pypdf parses it without repairs
+    """
+    lines = _wrap(synthetic_text(pages * 4500, seed))
+    per_page = 55
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled once the page objects are numbered
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+
+    for page in range(pages):
+        page_lines = lines[page * per_page:(page + 1) * per_page] or [""]
+        stream = "BT /F1 10 Tf 12 TL 50 780 Td " + " ".join(
+            f"({_pdf_escape(line)}) Tj T*" for line in page_lines
+        ) + " ET"
+        data = stream.encode("latin-1")
+
+        objects.append(b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream")
+        content_ref = len(objects)
+
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % ref for ref in page_refs),
+        len(page_refs)
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def document_rows(count: int) -> list:
+    """
+    Rows shaped like an admin document listing, for serialize_dict
+    """
+    now = datetime.utcnow()
+    return [
+        {
+            "_id": ObjectId(),
+            "userId": ObjectId(),
+            "filename": f"{i}_manual.pdf",
+            "status": "processed",
+            "enabled": True,
+            "createdAt": now,
+            "chunkConfig": {"chunker": "structured", "maxTokens": 200, "overlapTokens": 30},
+            "sources": [ObjectId(), ObjectId()],
+            "tags": ["manual", "v2"]
+        }
+        for i in range(count)
+    ]
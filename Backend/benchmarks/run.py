@@ -0,0 +1,378 @@
+"""
+Offline micro-benchmarks for the ingestion and answer hot paths.
+
+Runs without Ollama, Pinecone or MongoDB: a stub Ollama server answers on a
+local port, vectors go to the local store in a temp directory and Mongo is
+mongomock. Every benchmark reports p50/p99 latency and throughput, results
+are saved to benchmarks/results/ and compared with the previous run.
+
+    pip install -r requirements.txt -r benchmarks/requirements.txt
+    python -m benchmarks.run                          # run all, compare with the last run
+    python -m benchmarks.run --only chunk_text ask_question --repeat 50
+    python -m benchmarks.run --baseline benchmarks/results/<run>.json --fail-on-regression
+    python -m benchmarks.run --ollama-latency-ms 20   # model time on top of our overhead
+
+The numbers are the app's own overhead, not Ollama's; compare runs from the
+same machine only.
+"""
+import argparse
+import contextlib
+import glob
+import inspect
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from bson import ObjectId
+
+from benchmarks.fixtures import synthetic_text, write_pdf, document_rows
+from benchmarks.stub_ollama import StubOllama
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def measure(run, repeat: int, warmup: int = 1, setup=None, teardown=None) -> list:
+    """
+    Seconds per call of run(), setup and teardown are left out of the timing
+    """
+    timings = []
+    for iteration in range(warmup + repeat):
+        state = setup() if setup else None
+
+        started = time.perf_counter()
+        run(state)
+        elapsed = time.perf_counter() - started
+
+        if teardown:
+            teardown(state)
+        if iteration >= warmup:
+            timings.append(elapsed)
+
+    return timings
+
+
+def summarize(timings: list, units: float, unit: str) -> dict:
+    mean = sum(timings) / len(timings)
+    return {
+        "iterations": len(timings),
+        "p50_ms": percentile(timings, 50) * 1000,
+        "p99_ms": percentile(timings, 99) * 1000,
+        "mean_ms": mean * 1000,
+        "throughput": units / mean,
+        "unit": f"{unit}/s"
+    }
+
+
+def _patch_mongomock():
+    """
+    mongomock 4.3 predates the sort= option pymongo 4.11+ passes from
+    UpdateOne/ReplaceOne into bulk_write, accept and ignore it
+    """
+    from mongomock.collection import BulkOperationBuilder
+
+    for name in ("add_update", "add_replace"):
+        original = getattr(BulkOperationBuilder, name)
+        if "sort" in inspect.signature(original).parameters:
+            continue
+
+        def without_sort(self, *args, _original=original, sort=None, **kwargs):
+            return _original(self, *args, **kwargs)
+
+        setattr(BulkOperationBuilder, name, without_sort)
+
+
+class Environment:
+    """
+    Stub Ollama, mongomock and a temp vector store, wired up before the
+    app modules are imported because Config reads the environment at import
+    """
+
+    def __init__(self, ollama_latency_ms: float):
+        self.workdir = tempfile.mkdtemp(prefix="rag-bench-")
+        self.ollama = StubOllama(latency_ms=ollama_latency_ms)
+        base_url = self.ollama.start()
+
+        os.environ.update({
+            "SECRET_KEY": "bench",
+            "JWT_SECRET": "bench",
+            "OLLAMA_BASE_URL": base_url,
+            "OLLAMA_EMBED_MODEL": "bench-embed",
+            "OLLAMA_CHAT_MODEL": "bench-chat",
+            "VECTOR_STORE": "local",
+            "VECTOR_DB_PATH": os.path.join(self.workdir, "vectors"),
+            "ANSWER_CACHE_ENABLED": "false",
+            # Flushed explicitly between iterations, mongomock is not thread safe
+            "WRITE_BUFFER_FLUSH_SECONDS": "3600",
+            "WRITE_BUFFER_MAX_ITEMS": "1000000"
+        })
+
+        import mongomock
+        _patch_mongomock()
+
+        import app.extensions as extensions
+        from app.schema import ensure_indexes
+
+        extensions.mongo_client = mongomock.MongoClient()
+        extensions.db = extensions.mongo_client.get_database("bench")
+        extensions.mongo_connected = True
+        ensure_indexes(extensions.db)
+
+        self.db = extensions.db
+        self.user_id = str(self.db.users.insert_one({
+            "email": "bench@example.com",
+            "role": "user",
+            "createdAt": datetime.utcnow()
+        }).inserted_id)
+
+        self.txt_path = os.path.join(self.workdir, "document.txt")
+        self.pdf_path = os.path.join(self.workdir, "document.pdf")
+
+    def write_inputs(self, txt_bytes: int, pdf_pages: int):
+        with open(self.txt_path, "w", encoding="utf-8") as f:
+            f.write(synthetic_text(txt_bytes))
+        write_pdf(self.pdf_path, pdf_pages)
+
+    def new_document(self, file_path: str):
+        from app.services.upload_service import create_document
+
+        filename = os.path.basename(file_path)
+        return str(create_document(self.user_id, filename, filename, file_path))
+
+    def reset_caches(self):
+        from app.services.chunk_store import chunk_cache
+        from app.services.embedding_cache import embedding_cache
+
+        embedding_cache.memory.clear()
+        self.db.embedding_cache.delete_many({})
+        chunk_cache.clear()
+
+    def close(self):
+        self.ollama.stop()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def bench_load_text(env, args):
+    from app.utils.file_loader import load_text_from_file
+
+    results = {}
+    for name, path in (("load_text_from_file[txt]", env.txt_path), ("load_text_from_file[pdf]", env.pdf_path)):
+        megabytes = os.path.getsize(path) / (1024 * 1024)
+        timings = measure(lambda _: load_text_from_file(path), args.repeat)
+        results[name] = summarize(timings, megabytes, "MB")
+    return results
+
+
+def bench_chunk_text(env, args):
+    from app.utils.text_chunker import chunk_text, iter_structured_chunks
+
+    with open(env.txt_path, encoding="utf-8") as f:
+        text = f.read()
+    megabytes = len(text.encode("utf-8")) / (1024 * 1024)
+
+    return {
+        "chunk_text": summarize(
+            measure(lambda _: chunk_text(text, 500, 100), args.repeat), megabytes, "MB"
+        ),
+        "iter_structured_chunks": summarize(
+            measure(lambda _: list(iter_structured_chunks([(1, text)], 200, 30)), args.repeat),
+            megabytes, "MB"
+        )
+    }
+
+
+def bench_serialize_dict(env, args):
+    from app.utils.serializer import serialize_dict
+
+    rows = document_rows(1000)
+    timings = measure(lambda _: [serialize_dict(row) for row in rows], args.repeat)
+    return {"serialize_dict": summarize(timings, len(rows), "rows")}
+
+
+def bench_ingest_document(env, args):
+    """
+    Fresh ingestion with cold embedding caches, and the same bytes uploaded
+    again, which copies the first document's chunks and vectors
+    """
+    from app.services.document_service import DocumentService
+
+    service = DocumentService()
+    repeat = max(1, args.repeat // 4)
+
+    def fresh():
+        env.reset_caches()
+        return env.new_document(env.txt_path)
+
+    def ingest(document_id):
+        result = service.ingest_document(document_id, env.txt_path, env.user_id)
+        ingest.chunks = result["totalChunks"]
+
+    def remove(document_id):
+        service.clear_document(document_id, env.user_id)
+        env.db.documents.delete_one({"_id": ObjectId(document_id)})
+
+    timings = measure(ingest, repeat, setup=fresh, teardown=remove)
+    results = {"ingest_document": summarize(timings, ingest.chunks, "chunks")}
+
+    source = env.new_document(env.txt_path)
+    service.ingest_document(source, env.txt_path, env.user_id)
+
+    timings = measure(ingest, repeat, setup=lambda: env.new_document(env.txt_path), teardown=remove)
+    results["ingest_document[reuse]"] = summarize(timings, ingest.chunks, "chunks")
+
+    remove(source)
+    return results
+
+
+def bench_ask_question(env, args):
+    from app.services.chat_service import ChatService
+    from app.services.document_service import DocumentService
+    from app.services.write_buffer import write_buffer
+
+    document_id = env.new_document(env.txt_path)
+    DocumentService().ingest_document(document_id, env.txt_path, env.user_id)
+
+    service = ChatService()
+    questions = iter(f"How do I configure backup retry number {i}?" for i in range(10 ** 6))
+
+    timings = measure(
+        lambda question: service.ask_question(question, env.user_id, document_id),
+        args.repeat * 2,
+        setup=lambda: next(questions),
+        teardown=lambda _: write_buffer.flush()
+    )
+    return {"ask_question": summarize(timings, 1, "questions")}
+
+
+BENCHMARKS = {
+    "load_text_from_file": bench_load_text,
+    "chunk_text": bench_chunk_text,
+    "serialize_dict": bench_serialize_dict,
+    "ingest_document": bench_ingest_document,
+    "ask_question": bench_ask_question
+}
+
+
+def latest_result(exclude: str = None):
+    paths = sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")))
+    paths = [path for path in paths if path != exclude]
+    return paths[-1] if paths else None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    Print current vs baseline p50 and throughput, returns the names whose
+    p50 grew or throughput dropped by more than threshold
+    """
+    regressions = []
+    print(f"\n{'benchmark':<28} {'p50 before':>11} {'p50 now':>10} {'change':>8}  {'throughput change':>17}")
+
+    for name, now in current["results"].items():
+        before = baseline["results"].get(name)
+        if not before:
+            print(f"{name:<28} {'-':>11} {now['p50_ms']:>8.2f}ms {'new':>8}")
+            continue
+
+        p50_change = now["p50_ms"] / before["p50_ms"] - 1
+        throughput_change = now["throughput"] / before["throughput"] - 1
+        regressed = p50_change > threshold or throughput_change < -threshold
+
+        if regressed:
+            regressions.append(name)
+
+        print(
+            f"{name:<28} {before['p50_ms']:>9.2f}ms {now['p50_ms']:>8.2f}ms {p50_change:>+8.1%}  "
+            f"{throughput_change:>+17.1%}{'  REGRESSION' if regressed else ''}"
+        )
+
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--repeat", type=int, default=20, help="timed iterations per benchmark")
+    parser.add_argument("--txt-kb", type=int, default=512, help="size of the synthetic TXT document")
+    parser.add_argument("--pdf-pages", type=int, default=40, help="pages of the synthetic PDF")
+    parser.add_argument("--ollama-latency-ms", type=float, default=0, help="delay added by the stub Ollama")
+    parser.add_argument("--baseline", help="result file to compare with, defaults to the previous run")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative change reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 when a benchmark regressed")
+    parser.add_argument("--no-save", action="store_true", help="do not write the result file")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's own log output")
+    args = parser.parse_args(argv)
+
+    env = Environment(args.ollama_latency_ms)
+    try:
+        env.write_inputs(args.txt_kb * 1024, args.pdf_pages)
+
+        results = {}
+        for name in args.only or BENCHMARKS:
+            print(f"Running {name}...", file=sys.stderr)
+            with contextlib.redirect_stdout(sys.stdout if args.verbose else open(os.devnull, "w")):
+                results.update(BENCHMARKS[name](env, args))
+    finally:
+        env.close()
+
+    run = {
+        "createdAt": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {
+            "repeat": args.repeat,
+            "txtKb": args.txt_kb,
+            "pdfPages": args.pdf_pages,
+            "ollamaLatencyMs": args.ollama_latency_ms
+        },
+        "results": results
+    }
+
+    print(f"\n{'benchmark':<28} {'p50':>10} {'p99':>10} {'throughput':>18}")
+    for name, result in results.items():
+        print(
+            f"{name:<28} {result['p50_ms']:>8.2f}ms {result['p99_ms']:>8.2f}ms "
+            f"{result['throughput']:>10.1f} {result['unit']}"
+        )
+
+    path = None
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, datetime.utcnow().strftime("%Y%m%d-%H%M%S") + ".json")
+        with open(path, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"\nSaved {path}")
+
+    baseline_path = args.baseline or latest_result(exclude=path)
+    if not baseline_path:
+        return 0
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    if baseline.get("settings") != run["settings"]:
+        print(f"\nNote: {baseline_path} was run with different settings {baseline.get('settings')}")
+
+    print(f"\nCompared with {baseline_path}")
+    regressions = compare(run, baseline, args.threshold)
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        if args.fail_on_regression:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
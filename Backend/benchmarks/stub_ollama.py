@@ -0,0 +1,101 @@
+"""
+In-process stand-in for the Ollama HTTP API used by the benchmarks.
+
+Embeddings are deterministic per text (seeded from its sha256) so cache and
+search behave as with a real model; generation returns a fixed answer,
+streamed as NDJSON when asked to. latency_ms is added to every request.
+"""
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+ANSWER = "The manual describes the configuration, retry and backup procedures in detail."
+
+
+def embed(text: str, dimension: int) -> list:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(dimension).astype(np.float32).tolist()
+
+
+class StubOllama:
+    def __init__(self, dimension: int = 64, latency_ms: float = 0):
+        self.dimension = dimension
+        self.latency = latency_ms / 1000
+        self.requests = 0
+        self.server = None
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes, with Nagle on a
+            # keep-alive client waits for the delayed ACK on every request
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, payload: dict):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                stub.requests += 1
+
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                if self.path == "/api/embeddings":
+                    self._send_json({"embedding": embed(payload["prompt"], stub.dimension)})
+
+                elif self.path == "/api/embed":
+                    self._send_json({
+                        "embeddings": [embed(text, stub.dimension) for text in payload["input"]]
+                    })
+
+                elif self.path == "/api/generate" and payload.get("stream"):
+                    lines = [
+                        json.dumps({"response": token + " ", "done": False})
+                        for token in ANSWER.split()
+                    ] + [json.dumps({"response": "", "done": True})]
+                    body = ("\n".join(lines) + "\n").encode("utf-8")
+
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                elif self.path == "/api/generate":
+                    self._send_json({"response": ANSWER, "done": True})
+
+                else:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+
+        return Handler
+
+    def start(self) -> str:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="stub-ollama", daemon=True).start()
+
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
@@ -1,9 +1,13 @@
 from dotenv import load_dotenv
 load_dotenv()
 from app.main import create_app
+from app.utils.worker_pool import in_pool_worker
 
 
-app = create_app()
+# Spawned pool workers import this module as __mp_main__, only the server
+# process builds the app
+if not in_pool_worker():
+    app = create_app()
 
 if __name__ == '__main__' : 
     app.run(
@@ -0,0 +1,15 @@
+from dotenv import load_dotenv
+load_dotenv()
+import os
+
+from aiohttp import web
+
+from app.async_app import create_async_app
+
+
+if __name__ == '__main__' :
+    web.run_app(
+        create_async_app(),
+        host ='0.0.0.0',
+        port = int(os.getenv("ASYNC_PORT", 5001))
+    )
@@ -1,16 +1,36 @@
+import os
+import sys
+
 from dotenv import load_dotenv
 load_dotenv()
 
 from app.main import create_app
 from app.services.document_service import DocumentService
+from app.services.upload_service import create_document
+
+def main():
+    # python test_document_ingestion.py [file_path] [user_id]
+    file_path = sys.argv[1] if len(sys.argv) > 1 else "uploads/documents/sample.pdf"
+    user_id = sys.argv[2] if len(sys.argv) > 2 else os.getenv("TEST_USER_ID")
+
+    if not user_id:
+        sys.exit("Pass a user id as the second argument or set TEST_USER_ID")
+
+    # 🔥 CREATE APP (INITIALIZES MONGODB)
+    app = create_app()
+
+    # 🔥 ENTER APP CONTEXT
+    with app.app_context():
+        filename = os.path.basename(file_path)
+        document_id = create_document(user_id, filename, filename, file_path)
+
+        service = DocumentService()
+        result = service.ingest_document(str(document_id), file_path, user_id)
 
-# 🔥 CREATE APP (INITIALIZES MONGODB)
-app = create_app()
+        print("\nRESULT:")
+        print(result)
 
-# 🔥 ENTER APP CONTEXT
-with app.app_context():
-    service = DocumentService()
-    result = service.ingest_document("uploads/documents/sample.pdf")
 
-    print("\nRESULT:")
-    print(result)
+# Spawned PDF workers re-import this script as __mp_main__
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,32 @@ from dotenv import load_dotenv
 load_dotenv()
 from app.services.vector_service import VectorService
 
+TEST_USER_ID = "pinecone-test-user"
+TEST_DOCUMENT_ID = "pinecone-test-doc"
+
 def test_pinecone():
     vector_service = VectorService()
 
     print("👉 Adding vector to Pinecone...")
     vector_service.add_text(
         text="MongoDB is a NoSQL database used to store flexible JSON-like documents",
-        vector_id="test-doc-1",
-        metadata={"source": "pinecone-test"}
+        vector_id=f"{TEST_DOCUMENT_ID}_0",
+        metadata={"source": "pinecone-test", "documentId": TEST_DOCUMENT_ID, "chunkIndex": 0},
+        user_id=TEST_USER_ID
     )
 
     print("👉 Searching vector in Pinecone...")
-    results = vector_service.search("What is MongoDB?")
+    results = vector_service.search(
+        "What is MongoDB?",
+        user_id=TEST_USER_ID,
+        document_id=TEST_DOCUMENT_ID,
+        top_k=3
+    )
 
     print("\n✅ Pinecone Search Results:")
-    print(results)
+    print(results.matches)
+
+    vector_service.delete_document(TEST_USER_ID, TEST_DOCUMENT_ID)
 
 if __name__ == "__main__":
     test_pinecone()
@@ -1,3 +1,5 @@
+from dotenv import load_dotenv
+load_dotenv()
 from app.utils.file_loader import load_text_from_file
 
 # Put a sample PDF in this path
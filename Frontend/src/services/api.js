@@ -70,6 +70,32 @@ api.interceptors.response.use(
 );
 
 
+// Largest page the backend serves (PAGE_SIZE_MAX)
+const PAGE_SIZE = 200;
+
+/**
+ * GET a keyset-paginated listing and follow nextCursor to the last page.
+ * Resolves to the first response with every page's rows under data[key].
+ * History pages walk back in time, so olderFirst puts later pages in front.
+ */
+const getAllPages = async (url, key, { olderFirst = false } = {}) => {
+  const params = { limit: PAGE_SIZE };
+  const response = await api.get(url, { params });
+  let rows = response.data?.data?.[key] || [];
+  let cursor = response.data?.data?.nextCursor;
+
+  while (cursor) {
+    const page = await api.get(url, { params: { ...params, cursor } });
+    const pageRows = page.data?.data?.[key] || [];
+    rows = olderFirst ? [...pageRows, ...rows] : [...rows, ...pageRows];
+    cursor = page.data?.data?.nextCursor;
+  }
+
+  response.data.data = { ...response.data.data, [key]: rows, count: rows.length, nextCursor: null };
+  return response;
+};
+
+
 export const authAPI = {
   login: (data) => api.post("/auth/login", data),
   register: (data) => api.post("/auth/register", data),
@@ -107,7 +133,13 @@ export const chatAPI = {
       return Promise.reject(new Error("Valid documentId is required"));
     }
     
-    return api.get(`/chat/history?documentId=${documentId}`);
+    return getAllPages(`/chat/history?documentId=${documentId}`, "messages", {
+      olderFirst: true,
+    }).then((res) => {
+      res.data.messages = res.data.data.messages;
+      res.data.count = res.data.data.count;
+      return res;
+    });
   },
 };
 
@@ -115,14 +147,14 @@ export const chatAPI = {
 export const adminAPI = {
   stats: () => api.get("/admin/stats"),
   
-  users: () => api.get("/admin/users"),
+  users: () => getAllPages("/admin/users", "users"),
   userDocuments: (userId) => api.get(`/admin/users/${userId}/documents`),
   userQueries: (userId) => api.get(`/admin/users/${userId}/queries`),
   
-  documents: () => api.get("/admin/documents"),
+  documents: () => getAllPages("/admin/documents", "documents"),
   toggleDocument: (id) => api.patch(`/admin/documents/${id}/toggle`),
   
-  queries: () => api.get("/admin/queries"),
+  queries: () => getAllPages("/admin/queries", "queries"),
   usage: () => api.get("/admin/usage"),
 };
 